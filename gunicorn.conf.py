@@ -0,0 +1,34 @@
+import multiprocessing
+import os
+
+# Production server: gunicorn -c gunicorn.conf.py, from the repository root
+chdir = "stackunderflow"
+wsgi_app = "stackunderflow.asgi:application"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# The workers share their caches (question cache, tag registry invalidations, replica pins) through memcached
+if workers > 1 and not os.getenv("MEMCACHED_LOCATION"):
+    raise RuntimeError("Set MEMCACHED_LOCATION to run more than one worker, or set GUNICORN_WORKERS=1")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+# Workers are restarted after this many requests (plus jitter) to bound memory growth, 0 disables it
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+accesslog = "-"
+# Workers write their Prometheus metrics to files in this directory, /metrics aggregates them
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/stackunderflow-metrics")
+
+
+def on_starting(server):
+    # Metrics of a previous run would otherwise be added to the new ones
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+
+
+def child_exit(server, worker):
+    # Drops the gauges of exited workers, their counters and histograms are kept
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
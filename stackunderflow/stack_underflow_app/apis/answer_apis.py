@@ -1,18 +1,26 @@
 import logging
 
+from django.db import transaction
 from rest_framework import serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from stack_underflow_app.apis.comment_apis import CommentSerializer
-from stack_underflow_app.models import Answer, Comment, PostType, Votes
+from stack_underflow_app.instrumentation import (TimedListSerializer,
+                                                 TimedSerializerMixin)
+from stack_underflow_app.models import Answer, PostType
 from stack_underflow_app.permissions import (CustomPermissions,
                                              HasEnoughReputationPoints)
+from stack_underflow_app.queries import answer_read_queryset, load_comments
+from stack_underflow_app.read_serializers import (answer_payloads,
+                                                  fast_read_enabled,
+                                                  payload_response)
+from stack_underflow_app.votes import toggle_vote, vote_state
 
 logger = logging.getLogger(__name__)
 
 
-class AnswerSerializer(serializers.ModelSerializer):
+class AnswerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     created_at = serializers.ReadOnlyField()
     updated_at = serializers.ReadOnlyField()
     upvotes = serializers.ReadOnlyField()
@@ -21,7 +29,8 @@ class AnswerSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Answer
-        fields = "__all__"
+        list_serializer_class = TimedListSerializer
+        exclude = ["upvote_count", "downvote_count"]
 
     def update(self, instance, validated_data, **kwargs):
         request = kwargs.pop("request")
@@ -39,14 +48,16 @@ class AnswerSerializer(serializers.ModelSerializer):
         return serializers.ValidationError(detail={"error": "Request payload empty"})
 
     def get_comments(self, obj):
-        comments = Comment.objects.filter(post_type=PostType.objects.get(name=PostType.ANS),
-                                          post_id=obj.id)
-        serializer = CommentSerializer(comments, many=True)
+        # Comments are bulk loaded by the view, fall back to loading them for this answer alone
+        comments_by_post = self.context.get("comments_by_post")
+        if comments_by_post is None:
+            comments_by_post = load_comments(answer_ids=[obj.id])
+        serializer = CommentSerializer(comments_by_post.get((PostType.ANS, obj.id), []), many=True)
         return serializer.data
 
 
 class AnswerViewSet(ModelViewSet):
-    queryset = Answer.objects.all()
+    queryset = answer_read_queryset()
     serializer_class = AnswerSerializer
     permission_classes = [CustomPermissions]
 
@@ -67,8 +78,13 @@ class AnswerViewSet(ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         question_pk = kwargs["question_pk"]
+        if fast_read_enabled(request) and question_pk.isdecimal():
+            return payload_response(answer_payloads(question_pk))
+        answers = self.get_queryset().filter(question_id=question_pk)
+        context = self.get_serializer_context()
+        context["comments_by_post"] = load_comments(answer_ids=[answer.id for answer in answers])
         return Response(status=status.HTTP_200_OK,
-                        data=self.get_serializer(self.queryset.filter(question_id=question_pk), many=True).data)
+                        data=self.get_serializer(answers, many=True, context=context).data)
 
     def partial_update(self, request, *args, **kwargs):
         data = request.data
@@ -83,49 +99,21 @@ class AnswerViewSet(ModelViewSet):
         return Response(status=status.HTTP_200_OK)
 
     @action(methods=["POST"], detail=True, permission_classes=[HasEnoughReputationPoints])
+    @transaction.atomic
     def upvote(self, request, **kwargs):
-        user_id = request.user.id
         answer_id = kwargs["pk"]
         if self.get_object().author == request.user:
             return Response(status=status.HTTP_403_FORBIDDEN)
-        vote, created = Votes.objects.get_or_create(post_id=answer_id,
-                                                    post_type=PostType.objects.get(name=PostType.ANS),
-                                                    user_id=user_id,
-                                                    defaults={"upvote": True, "downvote": False})
-        had_already_voted = not created
-        vote_id = vote.id
-        if had_already_voted:
-            if vote.upvote:
-                # Remove the vote if user had already upvoted and now upvotes again
-                vote.delete()
-            else:
-                # Previous vote was a downvote and now user is upvoting
-                vote.upvote = True
-                vote.downvote = False
-                vote.save()
-        logger.info(msg=f"Vote with Id {vote_id} recorded successfully for Answer with Id {answer_id}")
-        return Response(status=status.HTTP_200_OK)
+        vote = toggle_vote(request.user.id, PostType.ANS, answer_id, upvote=True)
+        logger.info(msg=f"Vote recorded successfully for Answer with Id {answer_id}")
+        return Response(status=status.HTTP_200_OK, data=vote_state(vote))
 
     @action(methods=["POST"], detail=True, permission_classes=[HasEnoughReputationPoints])
+    @transaction.atomic
     def downvote(self, request, **kwargs):
-        user_id = request.user.id
         answer_id = kwargs["pk"]
         if self.get_object().author == request.user:
             return Response(status=status.HTTP_403_FORBIDDEN)
-        vote, created = Votes.objects.get_or_create(post_id=answer_id,
-                                                    post_type=PostType.objects.get(name=PostType.ANS),
-                                                    user_id=user_id,
-                                                    defaults={"upvote": False, "downvote": True})
-        had_already_voted = not created
-        vote_id = vote.id
-        if had_already_voted:
-            if vote.downvote:
-                # Remove the vote if user had already downvoted and now downvotes again
-                vote.delete()
-            else:
-                # Previous vote was a upvote and now user is downvoting
-                vote.upvote = False
-                vote.downvote = True
-                vote.save()
-        logger.info(msg=f"Vote with Id {vote_id} recorded successfully for Answer with Id {answer_id}")
-        return Response(status=status.HTTP_200_OK)
+        vote = toggle_vote(request.user.id, PostType.ANS, answer_id, upvote=False)
+        logger.info(msg=f"Vote recorded successfully for Answer with Id {answer_id}")
+        return Response(status=status.HTTP_200_OK, data=vote_state(vote))
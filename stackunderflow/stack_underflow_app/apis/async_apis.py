@@ -0,0 +1,243 @@
+import asyncio
+import logging
+from collections import defaultdict
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from stack_underflow_app.apis.answer_apis import AnswerSerializer
+from stack_underflow_app.apis.comment_apis import (AnswerCommentViewSet,
+                                                   CommentSerializer,
+                                                   QuestionCommentViewSet)
+from stack_underflow_app.apis.question_apis import (QuestionSerializer,
+                                                    invalid_feed_error,
+                                                    question_list_version)
+from stack_underflow_app.conditional import (build_entry, entry_response,
+                                             not_modified,
+                                             not_modified_response,
+                                             question_etag, question_list_etag)
+from stack_underflow_app.filters import QuestionFilter
+from stack_underflow_app.models import Answer, PostType, Question
+from stack_underflow_app.pagination import QuestionCursorPagination
+from stack_underflow_app.queries import (answer_read_queryset, load_comments,
+                                         question_read_queryset)
+from stack_underflow_app.rankings import feed_queryset
+from stack_underflow_app.read_serializers import (answer_payloads,
+                                                  comment_payloads,
+                                                  fast_read_enabled,
+                                                  payload_response,
+                                                  question_payloads,
+                                                  question_values, render_json)
+from stack_underflow_app.response_cache import question_cache
+from stack_underflow_app.routers import read_from_primary
+from stack_underflow_app.viewcounts import view_counter, viewer_key
+
+logger = logging.getLogger(__name__)
+
+# Async versions of the read endpoints, served in place of the DRF views for GET and HEAD when
+# ASYNC_READ_ENDPOINTS is set (see urls.py). They return the same payloads, rendered as JSON.
+
+
+def database_sync_to_async(func):
+    # Runs blocking work (ORM, cache) in a worker thread of its own, so that the independent queries of
+    # a request run concurrently. Connections are per thread and are recycled like at request boundaries.
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def api_request(request):
+    # DRF request for the parts shared with the DRF views: JWT authentication, pagination and filters
+    return Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+
+
+def authenticate(request):
+    # Up front, as the DRF views do, so that an invalid or expired token is refused whatever the view reads
+    return request.user
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+def not_found_response():
+    return json_response({"detail": "Not found."}, status=404)
+
+
+def read_endpoint(async_view, drf_view):
+    # Serves GET and HEAD with `async_view` and hands any other method to the DRF view of the same URL.
+    # Requests refused with an APIException (invalid token, invalid cursor) are handed to the DRF view too,
+    # which answers them with its usual error response: status, body and WWW-Authenticate header.
+    async def view(request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            try:
+                api = api_request(request)
+                await database_sync_to_async(authenticate)(api)
+                return await async_view(api, *args, **kwargs)
+            except APIException:
+                pass
+        return await sync_to_async(drf_view)(request, *args, **kwargs)
+    # Not csrf_exempt(), its wrapper is not a coroutine function in this Django version
+    view.csrf_exempt = True
+    # The viewset actions of the DRF view, for the request metrics
+    view.actions = drf_view.actions
+    return view
+
+
+def load_answers(question_ids):
+    answers_by_question = defaultdict(list)
+    for answer in answer_read_queryset().filter(question_id__in=question_ids):
+        answers_by_question[answer.question_id].append(answer)
+    return answers_by_question
+
+
+def load_thread_comments(question_ids):
+    # Comments of the questions and of their answers, the answers are selected in a subquery
+    # so that this does not have to wait for them to be loaded
+    return load_comments(question_ids=question_ids,
+                         answer_ids=Answer.objects.filter(question_id__in=question_ids).values("id"))
+
+
+def serialize_questions(questions, answers_by_question, comments_by_post, many):
+    context = {"answers_by_question": answers_by_question, "comments_by_post": comments_by_post}
+    return QuestionSerializer(questions, many=many, context=context).data
+
+
+async def question_list(request):
+    feed = request.query_params.get("feed")
+    error = invalid_feed_error(feed)
+    if error:
+        return json_response(error, status=400)
+    etag = question_list_etag(await database_sync_to_async(question_list_version)(feed), request)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    filterset = QuestionFilter(data=request.query_params, queryset=question_read_queryset(with_answers=False),
+                               request=request)
+    if not filterset.is_valid():
+        return json_response(filterset.errors, status=400)
+    questions = filterset.qs
+    if feed:
+        questions = feed_queryset(questions, feed)
+    paginator = QuestionCursorPagination()
+    if fast_read_enabled(request):
+        rows = question_values(questions, paginator.get_ordering(request, questions, None))
+        page = await database_sync_to_async(paginator.paginate_queryset)(rows, request)
+        data = await database_sync_to_async(question_payloads)(page)
+        response = payload_response(paginator.get_paginated_response(data).data)
+        response["ETag"] = etag
+        return response
+    page = await database_sync_to_async(paginator.paginate_queryset)(questions, request)
+    question_ids = [question.id for question in page]
+    answers_by_question, comments_by_post = await asyncio.gather(
+        database_sync_to_async(load_answers)(question_ids),
+        database_sync_to_async(load_thread_comments)(question_ids),
+    )
+    data = await database_sync_to_async(serialize_questions)(page, answers_by_question, comments_by_post, many=True)
+    response = json_response(paginator.get_paginated_response(data).data)
+    response["ETag"] = etag
+    return response
+
+
+async def question_detail(request, pk):
+    if not pk.isdecimal():
+        return not_found_response()
+    question_id = int(pk)
+    version = await database_sync_to_async(question_cache.version)(question_id)
+    etag = question_etag(question_id, version)
+    if not_modified(request, etag):
+        view_counter.record(question_id, await database_sync_to_async(viewer_key)(request))
+        return not_modified_response(etag)
+    entry = await database_sync_to_async(question_cache.get)(question_id, version)
+    cache_status = "HIT"
+    if entry is None:
+        read_from_primary()
+    if entry is None and fast_read_enabled(request):
+        payloads = await database_sync_to_async(question_payloads)(
+            question_values(Question.objects.filter(id=question_id)))
+        if not payloads:
+            return not_found_response()
+        entry = build_entry(payloads[0], version, render=render_json)
+        await database_sync_to_async(question_cache.set)(question_id, entry)
+        cache_status = "MISS"
+    if entry is None:
+        # The question, its answers and the comments of both are loaded concurrently
+        questions, answers_by_question, comments_by_post = await asyncio.gather(
+            database_sync_to_async(list)(question_read_queryset(with_answers=False).filter(id=question_id)),
+            database_sync_to_async(load_answers)([question_id]),
+            database_sync_to_async(load_thread_comments)([question_id]),
+        )
+        if not questions:
+            return not_found_response()
+        data = await database_sync_to_async(serialize_questions)(questions[0], answers_by_question,
+                                                                 comments_by_post, many=False)
+        entry = build_entry(data, version)
+        await database_sync_to_async(question_cache.set)(question_id, entry)
+        cache_status = "MISS"
+    view_counter.record(question_id, await database_sync_to_async(viewer_key)(request))
+    return entry_response(request, entry, etag, headers={"X-Cache": cache_status})
+
+
+def serialize_answers(answers, comments_by_post):
+    return AnswerSerializer(answers, many=True, context={"comments_by_post": comments_by_post}).data
+
+
+async def answer_list(request, question_pk):
+    if not question_pk.isdecimal():
+        return json_response([])
+    if fast_read_enabled(request):
+        return payload_response(await database_sync_to_async(answer_payloads)(question_pk))
+    answers_by_question, comments_by_post = await asyncio.gather(
+        database_sync_to_async(load_answers)([question_pk]),
+        database_sync_to_async(load_comments)(answer_ids=Answer.objects.filter(question_id=question_pk).values("id")),
+    )
+    return json_response(await database_sync_to_async(serialize_answers)(answers_by_question[int(question_pk)],
+                                                                         comments_by_post))
+
+
+def serialize_comments(viewset_class, post_pk):
+    return CommentSerializer(viewset_class().get_queryset(post_pk), many=True).data
+
+
+async def comment_list(request, post_model, viewset_class, post_pk):
+    if not post_pk.isdecimal():
+        return not_found_response()
+    fast = fast_read_enabled(request)
+    if fast:
+        serialize = partial(comment_payloads, PostType.QUES if post_model is Question else PostType.ANS, post_pk)
+    else:
+        serialize = partial(serialize_comments, viewset_class, post_pk)
+    # The post's existence is checked while its comments are loaded
+    exists, data = await asyncio.gather(
+        database_sync_to_async(post_model.objects.filter(pk=post_pk).exists)(),
+        database_sync_to_async(serialize)(),
+    )
+    if not exists:
+        return not_found_response()
+    return payload_response(data) if fast else json_response(data)
+
+
+async def question_comment_list(request, question_pk):
+    return await comment_list(request, Question, QuestionCommentViewSet, question_pk)
+
+
+async def answer_comment_list(request, answer_pk, **kwargs):
+    return await comment_list(request, Answer, AnswerCommentViewSet, answer_pk)
+
+
+# Async views by the URL names of the DRF routes they stand in for
+ASYNC_READ_VIEWS = {
+    "questions-list": question_list,
+    "questions-detail": question_detail,
+    "ques_answers-list": answer_list,
+    "ques_comments-list": question_comment_list,
+    "ans_comments-list": answer_comment_list,
+}
@@ -1,16 +1,26 @@
 import logging
 
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
+from stack_underflow_app.instrumentation import (TimedListSerializer,
+                                                 TimedSerializerMixin)
 from stack_underflow_app.models import Answer, Comment, PostType, Question
-from stack_underflow_app.permissions import CustomPermissions
+from stack_underflow_app.permissions import (CustomPermissions,
+                                             HasEnoughReputationPoints)
+from stack_underflow_app.read_serializers import (comment_payloads,
+                                                  fast_read_enabled,
+                                                  payload_response)
+from stack_underflow_app.registry import post_type_registry
+from stack_underflow_app.votes import toggle_vote, vote_state
 
 logger = logging.getLogger(__name__)
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     id = serializers.ReadOnlyField()
     created_at = serializers.ReadOnlyField()
     updated_at = serializers.ReadOnlyField()
@@ -18,6 +28,7 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
+        list_serializer_class = TimedListSerializer
         fields = [
             "id",
             "body",
@@ -31,7 +42,7 @@ class CommentSerializer(serializers.ModelSerializer):
         author = self.context["author"]
         comment = Comment.objects.create(body=validated_data["body"],
                                          post_id=validated_data["post_id"],
-                                         post_type=self.context["post_type"],
+                                         post_type_id=self.context["post_type_id"],
                                          author=author)
         return comment
 
@@ -40,14 +51,14 @@ class CommentViewSet(ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [CustomPermissions]
 
-    def create(self, request, post_type, post_pk):
+    def create(self, request, post_type_id, post_pk):
         comment_data = request.data
         comment_data["post_id"] = post_pk
         author = request.user
         serializer = self.get_serializer(data=comment_data,
                                          context={
                                             "author": author,
-                                            "post_type": post_type,
+                                            "post_type_id": post_type_id,
                                          })
         serializer.is_valid(raise_exception=True)
         comment = serializer.save()
@@ -80,18 +91,43 @@ class CommentViewSet(ModelViewSet):
         comment.delete()
         return Response(status=status.HTTP_200_OK)
 
+    @action(methods=["POST"], detail=True, permission_classes=[HasEnoughReputationPoints])
+    @transaction.atomic
+    def upvote(self, request, **kwargs):
+        comment = get_object_or_404(Comment, pk=kwargs["pk"])
+        if comment.author_id == request.user.id:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        vote = toggle_vote(request.user.id, PostType.COMT, comment.id, upvote=True)
+        logger.info(msg=f"Vote recorded successfully for Comment with Id {comment.id}")
+        return Response(status=status.HTTP_200_OK, data=vote_state(vote))
+
+    @action(methods=["POST"], detail=True, permission_classes=[HasEnoughReputationPoints])
+    @transaction.atomic
+    def downvote(self, request, **kwargs):
+        comment = get_object_or_404(Comment, pk=kwargs["pk"])
+        if comment.author_id == request.user.id:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        vote = toggle_vote(request.user.id, PostType.COMT, comment.id, upvote=False)
+        logger.info(msg=f"Vote recorded successfully for Comment with Id {comment.id}")
+        return Response(status=status.HTTP_200_OK, data=vote_state(vote))
+
 
 class QuestionCommentViewSet(CommentViewSet):
 
     def get_queryset(self, question_pk):
-        return Comment.objects.filter(post_type=PostType.objects.get(name=PostType.QUES), post_id=question_pk)
+        return Comment.objects.filter(post_type_id=post_type_registry.id_for(PostType.QUES),
+                                      post_id=question_pk).select_related("author").order_by("id")
 
     def create(self, request, **kwargs):
-        return super().create(request, post_type=PostType.objects.get(name=PostType.QUES), post_pk=kwargs["question_pk"])
+        return super().create(request,
+                              post_type_id=post_type_registry.id_for(PostType.QUES),
+                              post_pk=kwargs["question_pk"])
 
     def list(self, request, *args, **kwargs):
         question_pk = kwargs["question_pk"]
         get_object_or_404(Question, pk=question_pk)
+        if fast_read_enabled(request):
+            return payload_response(comment_payloads(PostType.QUES, question_pk))
         return Response(status=status.HTTP_200_OK,
                         data=self.get_serializer(self.get_queryset(question_pk), many=True).data)
 
@@ -99,13 +135,18 @@ class QuestionCommentViewSet(CommentViewSet):
 class AnswerCommentViewSet(CommentViewSet):
 
     def get_queryset(self, answer_pk):
-        return Comment.objects.filter(post_type=PostType.objects.get(name=PostType.ANS), post_id=answer_pk)
+        return Comment.objects.filter(post_type_id=post_type_registry.id_for(PostType.ANS),
+                                      post_id=answer_pk).select_related("author").order_by("id")
 
     def create(self, request, **kwargs):
-        return super().create(request, post_type=PostType.objects.get(name=PostType.ANS), post_pk=kwargs["answer_pk"])
+        return super().create(request,
+                              post_type_id=post_type_registry.id_for(PostType.ANS),
+                              post_pk=kwargs["answer_pk"])
 
     def list(self, request, *args, **kwargs):
         answer_pk = kwargs["answer_pk"]
         get_object_or_404(Answer, pk=answer_pk)
+        if fast_read_enabled(request):
+            return payload_response(comment_payloads(PostType.ANS, answer_pk))
         return Response(status=status.HTTP_200_OK,
                         data=self.get_serializer(self.get_queryset(answer_pk), many=True).data)
@@ -1,22 +1,51 @@
 import logging
 from json import dumps, loads
 
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from stack_underflow_app.apis.answer_apis import AnswerSerializer
 from stack_underflow_app.apis.comment_apis import CommentSerializer
 from stack_underflow_app.apis.tag_apis import TagSerializer
-from stack_underflow_app.models import (Answer, Comment, PostType, Question,
-                                        Tag, Votes)
+from stack_underflow_app.conditional import (build_entry, entry_response,
+                                             not_modified,
+                                             not_modified_response,
+                                             question_etag, question_list_etag)
+from stack_underflow_app.filters import QuestionFilter
+from stack_underflow_app.instrumentation import (TimedListSerializer,
+                                                 TimedSerializerMixin)
+from stack_underflow_app.models import PostType, Question
+from stack_underflow_app.pagination import (QuestionCursorPagination,
+                                            SearchPagination)
 from stack_underflow_app.permissions import (CustomPermissions,
                                              HasEnoughReputationPoints)
+from stack_underflow_app.queries import (load_comments, load_question_comments,
+                                         question_read_queryset)
+from stack_underflow_app.rankings import FEEDS, feed_queryset, rankings_version
+from stack_underflow_app.read_serializers import (fast_read_enabled,
+                                                  payload_response,
+                                                  question_payloads,
+                                                  question_values, render_json)
+from stack_underflow_app.registry import tag_registry
+from stack_underflow_app.response_cache import question_cache
+from stack_underflow_app.routers import read_from_primary
+from stack_underflow_app.search import search_questions
+from stack_underflow_app.streaming import (NDJSONRenderer,
+                                           StreamingJSONRenderer,
+                                           queryset_batches,
+                                           streaming_response)
+from stack_underflow_app.viewcounts import view_counter, viewer_key
+from stack_underflow_app.votes import toggle_vote, vote_state
 
 logger = logging.getLogger(__name__)
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=False)
     created_at = serializers.ReadOnlyField()
     updated_at = serializers.ReadOnlyField()
@@ -31,7 +60,9 @@ class QuestionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Question
-        fields = "__all__"
+        list_serializer_class = TimedListSerializer
+        exclude = ["upvote_count", "downvote_count", "search_vector", "last_activity_at", "hot_score", "trending_score",
+                   "week_score", "month_score"]
 
     def create(self, validated_data):
         logger.info(msg="Creating Question object")
@@ -42,14 +73,11 @@ class QuestionSerializer(serializers.ModelSerializer):
         user = self.context["request"].user
         serializer = TagSerializer(data=tags_data, many=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        tag_objects = []
-        for tag in tags_data:
-            tag_objects.append(Tag.objects.get(name=tag["name"]))
+        tag_ids = tag_registry.get_or_create_ids([tag["name"] for tag in tags_data])
         question = Question.objects.create(**validated_data)
         question.author = user
         question.save()
-        question.tags.set(tag_objects)
+        question.tags.set(tag_ids)
         return question
 
     def update(self, instance, validated_data):
@@ -61,10 +89,8 @@ class QuestionSerializer(serializers.ModelSerializer):
             or "comments" in validated_data
         ):
             raise serializers.ValidationError(detail={"error": "Cannot modify given fields"})
-        tag_objects = []
         tags_data = validated_data.pop("tags", [])
-        for tag in tags_data:
-            tag_objects.append(Tag.objects.get(name=tag["name"]))
+        tag_ids = tag_registry.ids_for([tag["name"] for tag in tags_data])
         modified_fields = []
         if "title" in validated_data:
             instance.title = validated_data["title"]
@@ -81,41 +107,106 @@ class QuestionSerializer(serializers.ModelSerializer):
         if not modified_fields:
             raise serializers.ValidationError(detail={"error": "Request payload empty"})
         instance.save(update_fields=modified_fields)
-        instance.tags.set(tag_objects)
+        instance.tags.set(tag_ids)
         return instance
 
     def get_answers(self, obj):
-        answers = Answer.objects.filter(question=obj)
-        serializer = AnswerSerializer(answers, many=True)
+        # Answers are prefetched by question_read_queryset, or loaded by the async views
+        answers_by_question = self.context.get("answers_by_question")
+        answers = obj.answer_set.all() if answers_by_question is None else answers_by_question.get(obj.id, [])
+        serializer = AnswerSerializer(answers, many=True, context=self.context)
         return serializer.data
 
     def get_comments(self, obj):
-        comments = Comment.objects.filter(post_type=PostType.objects.get(name=PostType.QUES),
-                                          post_id=obj.id)
-        serializer = CommentSerializer(comments, many=True)
+        # Comments are bulk loaded by the view, fall back to loading them for this question alone
+        comments_by_post = self.context.get("comments_by_post")
+        if comments_by_post is None:
+            comments_by_post = load_comments(question_ids=[obj.id])
+        serializer = CommentSerializer(comments_by_post.get((PostType.QUES, obj.id), []), many=True)
         return serializer.data
 
 
+def invalid_feed_error(feed):
+    if feed is not None and feed not in FEEDS:
+        return {"error": f"feed must be one of {', '.join(FEEDS)}"}
+    return None
+
+
+def question_list_version(feed):
+    list_version = question_cache.list_version()
+    if feed:
+        # Feeds are reordered by every rankings run, not only by changes to questions
+        list_version = f"{list_version}:{rankings_version()}"
+    return list_version
+
+
 class QuestionViewSet(ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [CustomPermissions]
+    pagination_class = QuestionCursorPagination
+    filterset_class = QuestionFilter
+
+    def get_queryset(self):
+        if self.action in ("list", "retrieve", "search", "export"):
+            return question_read_queryset()
+        return super().get_queryset()
 
     def get_serializer(self, *args, **kwargs):
         data = kwargs.pop("data", None)
         request = kwargs.pop("request", None)
-        if self.action == "list":
-            return QuestionSerializer(self.queryset, many=True, **kwargs)
+        if self.action in ("list", "search", "export"):
+            context = {"comments_by_post": load_question_comments(data)}
+            return QuestionSerializer(data, many=True, context=context, **kwargs)
         elif self.action == "retrieve":
-            return QuestionSerializer(data, **kwargs)
+            context = {"comments_by_post": load_question_comments([data])}
+            return QuestionSerializer(data, context=context, **kwargs)
         elif self.action == "create":
             return QuestionSerializer(data=data, context={"request": request}, **kwargs)
         elif self.action == "partial_update":
             return QuestionSerializer(data=data, context={"request": request}, **kwargs)
 
     def list(self, request):
-        serializer = self.get_serializer()
-        return Response(status=status.HTTP_200_OK, data=serializer.data)
+        feed = request.query_params.get("feed")
+        error = invalid_feed_error(feed)
+        if error:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data=error)
+        etag = question_list_etag(question_list_version(feed), request)
+        if not_modified(request, etag):
+            return not_modified_response(etag)
+        questions = self.filter_queryset(self.get_queryset())
+        if feed:
+            questions = feed_queryset(questions, feed)
+        if fast_read_enabled(request):
+            ordering = self.paginator.get_ordering(request, questions, self)
+            page = self.paginate_queryset(question_values(questions, ordering))
+            response = payload_response(self.get_paginated_response(question_payloads(page)).data)
+        else:
+            page = self.paginate_queryset(questions)
+            serializer = self.get_serializer(data=page)
+            response = self.get_paginated_response(serializer.data)
+        response["ETag"] = etag
+        return response
+
+    @action(methods=["GET"], detail=False, pagination_class=SearchPagination)
+    def search(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data={"error": "Search query is required"})
+        questions = search_questions(self.filter_queryset(self.get_queryset()), query)
+        page = self.paginate_queryset(questions)
+        serializer = self.get_serializer(data=page)
+        return self.get_paginated_response(serializer.data)
+
+    # All the questions matching the filters, oldest first, streamed as a JSON array or as NDJSON
+    @action(methods=["GET"], detail=False, permission_classes=[IsAuthenticated],
+            renderer_classes=[StreamingJSONRenderer, NDJSONRenderer])
+    def export(self, request):
+        questions = self.filter_queryset(self.get_queryset()).order_by("id")
+        # The rows are read after the view returns, from the database routed to for this request
+        questions = questions.using(questions.db)
+        batches = queryset_batches(questions, settings.EXPORT_BATCH_SIZE)
+        return streaming_response(request, (self.get_serializer(data=batch).data for batch in batches))
 
     def create(self, request):
         question_data = request.data
@@ -126,8 +217,31 @@ class QuestionViewSet(ModelViewSet):
         return Response(status=status.HTTP_201_CREATED)
 
     def retrieve(self, request, pk):
-        serializer = self.get_serializer(data=self.get_object())
-        return Response(status=status.HTTP_200_OK, data=serializer.data)
+        # Only canonical ids are looked up, the cache is invalidated by question id
+        if not pk.isdecimal():
+            raise NotFound()
+        question_id = int(pk)
+        version = question_cache.version(question_id)
+        etag = question_etag(question_id, version)
+        if not_modified(request, etag):
+            view_counter.record(question_id, viewer_key(request))
+            return not_modified_response(etag)
+        entry = question_cache.get(question_id, version)
+        cache_status = "HIT"
+        if entry is None:
+            read_from_primary()
+            if fast_read_enabled(request):
+                payloads = question_payloads(question_values(Question.objects.filter(id=question_id)))
+                if not payloads:
+                    raise NotFound()
+                entry = build_entry(payloads[0], version, render=render_json)
+            else:
+                serializer = self.get_serializer(data=self.get_object())
+                entry = build_entry(serializer.data, version)
+            question_cache.set(question_id, entry)
+            cache_status = "MISS"
+        view_counter.record(question_id, viewer_key(request))
+        return entry_response(request, entry, etag, headers={"X-Cache": cache_status})
 
     def partial_update(self, request, pk):
         question_data = request.data
@@ -140,43 +254,15 @@ class QuestionViewSet(ModelViewSet):
         return Response(status=status.HTTP_200_OK)
 
     @action(methods=["POST"], detail=True, permission_classes=[HasEnoughReputationPoints])
+    @transaction.atomic
     def upvote(self, request, pk):
-        user_id = request.user.id
-        question_id = pk
-        vote, created = Votes.objects.get_or_create(post_id=question_id,
-                                                    post_type=PostType.objects.get(name=PostType.QUES),
-                                                    user_id=user_id,
-                                                    defaults={"upvote": True, "downvote": False})
-        had_already_voted = not created
-        if had_already_voted:
-            if vote.upvote:
-                # Remove the vote if user had already upvoted and now upvotes again
-                vote.delete()
-            else:
-                # Previous vote was a downvote and now user is upvoting
-                vote.upvote = True
-                vote.downvote = False
-                vote.save()
-        logger.info(msg=f"Vote with Id {vote.id} recorded successfully")
-        return Response(status=status.HTTP_200_OK)
+        vote = toggle_vote(request.user.id, PostType.QUES, pk, upvote=True)
+        logger.info(msg=f"Vote recorded successfully for Question with Id {pk}")
+        return Response(status=status.HTTP_200_OK, data=vote_state(vote))
 
     @action(methods=["POST"], detail=True, permission_classes=[HasEnoughReputationPoints])
+    @transaction.atomic
     def downvote(self, request, pk):
-        user_id = request.user.id
-        question_id = pk
-        vote, created = Votes.objects.get_or_create(post_id=question_id,
-                                                    post_type=PostType.objects.get(name=PostType.QUES),
-                                                    user_id=user_id,
-                                                    defaults={"upvote": False, "downvote": True})
-        had_already_voted = not created
-        if had_already_voted:
-            if vote.downvote:
-                # Remove the vote if user had already downvoted and now downvotes again
-                vote.delete()
-            else:
-                # Previous vote was a upvote and now user is downvoting
-                vote.upvote = False
-                vote.downvote = True
-                vote.save()
-        logger.info(msg=f"Vote with Id {vote.id} recorded successfully")
-        return Response(status=status.HTTP_200_OK)
+        vote = toggle_vote(request.user.id, PostType.QUES, pk, upvote=False)
+        logger.info(msg=f"Vote recorded successfully for Question with Id {pk}")
+        return Response(status=status.HTTP_200_OK, data=vote_state(vote))
@@ -0,0 +1,17 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from stack_underflow_app.db_pool.base import pool_stats
+from stack_underflow_app.response_cache import question_cache
+
+
+class StatsViewSet(ViewSet):
+    permission_classes = [IsAdminUser]
+
+    # Runtime stats of this worker process
+    def list(self, request):
+        return Response(status=status.HTTP_200_OK, data={
+            "db_pools": pool_stats(),
+            "question_cache": question_cache.stats(),
+        })
@@ -1,21 +1,28 @@
 import logging
 from json import dumps, loads
 
+from django.conf import settings
 from rest_framework import serializers, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
+from stack_underflow_app.instrumentation import (TimedListSerializer,
+                                                 TimedSerializerMixin)
 from stack_underflow_app.models import Tag
+from stack_underflow_app.permissions import CustomPermissions
+from stack_underflow_app.registry import tag_prefix_index
 
 logger = logging.getLogger(__name__)
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     name = serializers.CharField()
 
     class Meta:
         model = Tag
-        fields = "__all__"
+        list_serializer_class = TimedListSerializer
+        fields = ["id", "name"]
 
     def create(self, validated_data):
         if not validated_data:
@@ -27,9 +34,16 @@ class TagSerializer(serializers.ModelSerializer):
         return tag
 
 
+# The tag endpoints also show how many questions have the tag, which the tags nested in questions leave out
+class TagCountSerializer(TagSerializer):
+
+    class Meta(TagSerializer.Meta):
+        fields = ["id", "name", "question_count"]
+
+
 class TagViewSet(ModelViewSet):
-    queryset = Tag.objects.all()
-    serializer_class = TagSerializer
+    queryset = Tag.objects.order_by("-question_count", "name")
+    serializer_class = TagCountSerializer
     permission_classes = [IsAdminUser]
 
     def create(self, request):
@@ -39,3 +53,15 @@ class TagViewSet(ModelViewSet):
         serializer.save()
         logger.info(msg="Tag created successfully")
         return Response(status=status.HTTP_201_CREATED)
+
+    @action(methods=["GET"], detail=False, permission_classes=[CustomPermissions])
+    def suggest(self, request):
+        prefix = request.query_params.get("prefix", "").strip()
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), settings.TAG_SUGGEST_MAX_RESULTS)
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data={"error": "limit must be a number"})
+        if not prefix:
+            # Every tag would match, nothing to suggest yet
+            return Response(status=status.HTTP_200_OK, data=[])
+        return Response(status=status.HTTP_200_OK, data=tag_prefix_index.suggest(prefix, limit))
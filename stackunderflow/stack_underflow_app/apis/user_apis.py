@@ -0,0 +1,34 @@
+import logging
+
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from stack_underflow_app.models import User
+from stack_underflow_app.permissions import CustomPermissions
+from stack_underflow_app.reputation import reputation_history
+
+logger = logging.getLogger(__name__)
+
+MAX_HISTORY_DAYS = 365
+
+
+class ReputationViewSet(ViewSet):
+    permission_classes = [CustomPermissions]
+
+    def retrieve(self, request, pk):
+        user = get_object_or_404(User.objects.only("id", "username", "reputation_points"), pk=pk)
+        try:
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data={"error": "days must be a number"})
+        if not 0 < days <= MAX_HISTORY_DAYS:
+            return Response(status=status.HTTP_400_BAD_REQUEST,
+                            data={"error": f"days must be between 1 and {MAX_HISTORY_DAYS}"})
+        history, gained = reputation_history(user.id, days)
+        return Response(status=status.HTTP_200_OK, data={
+            "user": user.username,
+            "reputation_points": user.reputation_points,
+            "gained": gained,
+            "history": history,
+        })
@@ -0,0 +1,43 @@
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from stack_underflow_app.models import PostType
+from stack_underflow_app.permissions import HasEnoughReputationPoints
+from stack_underflow_app.votes import apply_vote_batch
+
+logger = logging.getLogger(__name__)
+
+
+class VoteSerializer(serializers.Serializer):
+    post_type = serializers.ChoiceField(choices=PostType.POST_TYPES)
+    post_id = serializers.IntegerField(min_value=1)
+    direction = serializers.ChoiceField(choices=["up", "down"])
+
+
+class VoteViewSet(ViewSet):
+    permission_classes = [HasEnoughReputationPoints]
+
+    # Replays votes cast offline, in order, as if each had been sent to the post's vote endpoint
+    @action(methods=["POST"], detail=False)
+    def batch(self, request):
+        if not isinstance(request.data, dict):
+            raise serializers.ValidationError(detail={"error": "Expected an object with the list of votes"})
+        serializer = VoteSerializer(data=request.data.get("votes"), many=True, allow_empty=False,
+                                    max_length=settings.VOTE_BATCH_MAX_SIZE)
+        serializer.is_valid(raise_exception=True)
+        items = [{"post_type": vote["post_type"], "post_id": vote["post_id"], "upvote": vote["direction"] == "up"}
+                 for vote in serializer.validated_data]
+        try:
+            with transaction.atomic():
+                results = apply_vote_batch(request.user.id, items)
+        except IntegrityError:
+            # A vote on one of the posts was cast concurrently, nothing was applied
+            return Response(status=status.HTTP_409_CONFLICT,
+                            data={"error": "Votes changed while the batch was applied, please retry"})
+        logger.info(msg=f"Batch of {len(items)} votes applied for user {request.user}")
+        return Response(status=status.HTTP_200_OK, data={"results": results})
@@ -1,4 +1,9 @@
+import logging
+
 from django.apps import AppConfig
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
 
 
 class StackUnderflowAppConfig(AppConfig):
@@ -10,3 +15,12 @@ class StackUnderflowAppConfig(AppConfig):
 
         # Silence flake8 "unused import" error
         assert stack_underflow_app.signals
+
+        from stack_underflow_app.registry import (post_type_registry,
+                                                  tag_prefix_index)
+        try:
+            post_type_registry.load()
+            tag_prefix_index.load()
+        except DatabaseError:
+            # Eg. before the first migration, the registries then load on first use
+            logger.warning(msg="Could not load post types and tags, deferring to first use")
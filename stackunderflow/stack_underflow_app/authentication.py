@@ -0,0 +1,127 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from stack_underflow_app.metrics import cache_lookup
+
+
+class VerifiedTokens:
+    # Bounded LRU of raw token -> validated token, so that the signature of a token is checked once
+    # per worker instead of on every request. Entries are dropped once their token expires.
+
+    def __init__(self, max_size):
+        self._tokens = OrderedDict()
+        self._max_size = max_size
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self._lock:
+            token = self._tokens.get(raw_token)
+            if token is None:
+                return None
+            if token["exp"] <= time.time():
+                del self._tokens[raw_token]
+                return None
+            self._tokens.move_to_end(raw_token)
+            return token
+
+    def put(self, raw_token, token):
+        with self._lock:
+            self._tokens[raw_token] = token
+            while len(self._tokens) > self._max_size:
+                self._tokens.popitem(last=False)
+
+
+class UserCache:
+    # Bounded LRU of user id -> user, each entry kept for at most `timeout` seconds. Entries are dropped when
+    # a User is saved or deleted in this process, and expire within `timeout` for changes made by other workers.
+    # Changes made without saving the User (the reputation aggregator's bulk updates) bump a generation number
+    # kept in the shared cache, which drops every worker's entries within `sync_interval` seconds.
+
+    GENERATION_KEY = "auth_user_cache_generation"
+
+    def __init__(self, max_size, timeout, sync_interval):
+        self._users = OrderedDict()
+        self._max_size = max_size
+        self._timeout = timeout
+        self._sync_interval = sync_interval
+        self._generation = None
+        self._synced_at = 0
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._synced_at < self._sync_interval:
+            return
+        self._synced_at = now
+        generation = cache.get(self.GENERATION_KEY)
+        with self._lock:
+            if generation != self._generation:
+                self._users.clear()
+                self._generation = generation
+
+    def get(self, user_id):
+        self._sync()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            user, cached_at = entry
+            if time.monotonic() - cached_at > self._timeout:
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+        # Requests get their own copy, as views may change the user they are given
+        return copy.copy(user)
+
+    def put(self, user):
+        with self._lock:
+            self._users[user.pk] = (copy.copy(user), time.monotonic())
+            while len(self._users) > self._max_size:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._users.clear()
+        try:
+            generation = cache.incr(self.GENERATION_KEY)
+        except ValueError:
+            generation = 1
+            cache.set(self.GENERATION_KEY, generation, timeout=None)
+        self._generation = generation
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    # JWTAuthentication serving verified tokens and their users from memory, so that authenticating
+    # a request does not query the database once its user is cached
+
+    def get_validated_token(self, raw_token):
+        token = verified_tokens.get(raw_token)
+        cache_lookup("auth_token", token is not None)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            verified_tokens.put(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        # Only active users are cached, deactivating a user saves it, which drops it from the cache
+        user = user_cache.get(validated_token.get(api_settings.USER_ID_CLAIM))
+        cache_lookup("auth_user", user is not None)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.put(user)
+        return user
+
+
+verified_tokens = VerifiedTokens(max_size=settings.AUTH_TOKEN_CACHE_SIZE)
+user_cache = UserCache(max_size=settings.AUTH_USER_CACHE_SIZE, timeout=settings.AUTH_USER_CACHE_TIMEOUT,
+                       sync_interval=settings.AUTH_USER_CACHE_SYNC_INTERVAL)
@@ -0,0 +1,52 @@
+from itertools import islice
+
+from django.db import connection
+
+
+def chunks(iterable, size):
+    # Lists of up to `size` items, consuming the iterable lazily
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def bulk_increment(model, field_names, deltas, batch_size=1000):
+    # Adds deltas to columns with one UPDATE per batch of rows: UPDATE ... FROM (VALUES ...) on PostgreSQL,
+    # CASE expressions elsewhere. `field_names` is a field name or a tuple of them, and `deltas` maps
+    # primary keys to a delta or to a tuple of deltas, respectively.
+    # Rows are updated in primary key order so that concurrent callers lock them in the same order.
+    if isinstance(field_names, str):
+        field_names = (field_names,)
+        deltas = {key: (delta,) for key, delta in deltas.items()}
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [quote(model._meta.get_field(field_name).column) for field_name in field_names]
+    pk = quote(model._meta.pk.column)
+    items = sorted((key, tuple(values)) for key, values in deltas.items() if any(values))
+    updated = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            if connection.vendor == "postgresql":
+                row = f"({', '.join(['%s'] * (len(columns) + 1))})"
+                assignments = ", ".join(f"{column} = {table}.{column} + v.d{index}"
+                                        for index, column in enumerate(columns))
+                sql = (
+                    f"UPDATE {table} SET {assignments} "
+                    f"FROM (VALUES {', '.join([row] * len(batch))}) "
+                    f"AS v(id, {', '.join(f'd{index}' for index in range(len(columns)))}) "
+                    f"WHERE {table}.{pk} = v.id"
+                )
+                params = [value for key, values in batch for value in (key, *values)]
+            else:
+                cases = " ".join(["WHEN %s THEN %s"] * len(batch))
+                assignments = ", ".join(f"{column} = {column} + CASE {pk} {cases} ELSE 0 END" for column in columns)
+                sql = f"UPDATE {table} SET {assignments} WHERE {pk} IN ({', '.join(['%s'] * len(batch))})"
+                params = [value for index in range(len(columns)) for key, values in batch
+                          for value in (key, values[index])]
+                params += [key for key, _ in batch]
+            cursor.execute(sql, params)
+            updated += cursor.rowcount
+    return updated
@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+
+def question_etag(question_id, version):
+    # Weak, the same tag is sent for the identity, gzip and br bodies of the question
+    return f'W/"{question_id}-{version}"'
+
+
+def question_list_etag(list_version, request):
+    # Every page (cursor, page size) of the list is a representation of its own
+    digest = hashlib.sha1(f"{list_version}?{request.GET.urlencode()}".encode()).hexdigest()
+    return f'"questions-{digest}"'
+
+
+def _opaque_tag(etag):
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def not_modified(request, etag):
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if not if_none_match:
+        return False
+    return _opaque_tag(etag) in [_opaque_tag(tag) for tag in parse_etags(if_none_match)]
+
+
+def not_modified_response(etag):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    return response
+
+
+def build_entry(data, version, render=None):
+    # Renders the payload once and keeps the compressed variants next to it,
+    # so that serving a cached entry never has to render or compress again
+    body = (render or JSONRenderer().render)(data)
+    entry = {"version": version, "identity": body}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        entry["gzip"] = gzip.compress(body)
+        if brotli is not None:
+            entry["br"] = brotli.compress(body)
+    return entry
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for coding in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def entry_response(request, entry, etag, headers=None):
+    accepted = _accepted_encodings(request)
+    encoding = next((name for name in ("br", "gzip") if name in entry and name in accepted), None)
+    response = HttpResponse(entry[encoding or "identity"], content_type="application/json")
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    for header, value in (headers or {}).items():
+        response[header] = value
+    return response
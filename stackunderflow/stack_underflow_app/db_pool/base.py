@@ -0,0 +1,84 @@
+import threading
+from functools import partial
+
+from django.db.backends.postgresql import base
+from psycopg2 import Error, OperationalError, extensions
+from stack_underflow_app.db_pool.pool import ConnectionPool, PoolTimeout
+
+# PostgreSQL backend handing out connections from a per process pool (ENGINE "stack_underflow_app.db_pool").
+# Django closes a connection at the end of each request (CONN_MAX_AGE = 0), which here returns it to the pool.
+# Pools are created on first use, so each worker process of a pre-forking server gets its own.
+
+POOL_DEFAULTS = {
+    "MIN_SIZE": 2,
+    "MAX_SIZE": 20,
+    "MAX_LIFETIME": 3600,
+    "MAX_IDLE": 300,
+    "TIMEOUT": 10,
+    "CHECK_AFTER": 5,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def check_connection(connection):
+    try:
+        # In autocommit, so the check leaves no transaction open on the pooled connection
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except Error:
+        return False
+    return True
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self, conn_params):
+        with _pools_lock:
+            if self.alias not in _pools:
+                options = {**POOL_DEFAULTS, **self.settings_dict.get("POOL", {})}
+                _pools[self.alias] = ConnectionPool(
+                    connect=partial(base.DatabaseWrapper.get_new_connection, self, conn_params),
+                    check=check_connection,
+                    min_size=options["MIN_SIZE"],
+                    max_size=options["MAX_SIZE"],
+                    max_lifetime=options["MAX_LIFETIME"],
+                    max_idle=options["MAX_IDLE"],
+                    timeout=options["TIMEOUT"],
+                    check_after=options["CHECK_AFTER"],
+                )
+            return _pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection = self.get_pool(conn_params).getconn()
+        except PoolTimeout as error:
+            raise OperationalError(str(error))
+        # Set by the base class when a connection is opened, a reused one still has the level it was opened with
+        self.isolation_level = self.settings_dict["OPTIONS"].get("isolation_level", connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        # Closed inside atomic(), Django keeps self.connection until the block exits, so it can't go back to the
+        # pool where another thread could take it
+        discard = connection.closed or self.in_atomic_block
+        if not discard:
+            # Hand it out again as a new connection is: no transaction open and in autocommit
+            try:
+                if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+                connection.autocommit = True
+            except Error:
+                discard = True
+        _pools[self.alias].putconn(connection, discard=discard)
@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    # Thread safe pool of DB-API connections. Idle connections are reused most recently returned first
+    # and the ones idle for longer than `max_idle` are closed, down to `min_size`. Connections older than
+    # `max_lifetime` are closed when returned, and the ones idle for more than `check_after` seconds are
+    # checked with `check` before being handed out again.
+    def __init__(self, connect, check, min_size, max_size, max_lifetime, max_idle, timeout, check_after):
+        self._connect = connect
+        self._check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.check_after = check_after
+        self._lock = threading.Condition()
+        # (connection, created at, returned at), oldest returned first
+        self._idle = deque()
+        # id(connection) -> created at
+        self._in_use = {}
+        self._size = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._created = 0
+        self._closed = 0
+        self._timeouts = 0
+        self._failed_checks = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            connection, created_at, idle_since = self._checkout(deadline)
+            if connection is None:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+                created_at = time.monotonic()
+                with self._lock:
+                    self._created += 1
+            elif time.monotonic() - idle_since > self.check_after and not self._check(connection):
+                # The server went away or closed it meanwhile, try another one
+                with self._lock:
+                    self._failed_checks += 1
+                self._discard(connection, created_at)
+                continue
+            with self._lock:
+                self._in_use[id(connection)] = created_at
+                waited = time.monotonic() - started
+                self._checkouts += 1
+                self._wait_time += waited
+                self._max_wait_time = max(self._max_wait_time, waited)
+            return connection
+
+    def putconn(self, connection, discard=False):
+        now = time.monotonic()
+        with self._lock:
+            created_at = self._in_use.pop(id(connection))
+            if not discard and now - created_at < self.max_lifetime:
+                self._idle.append((connection, created_at, now))
+                self._lock.notify()
+                connection = None
+        if connection is not None:
+            self._discard(connection, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "connections_created": self._created,
+                "connections_closed": self._closed,
+                "failed_checks": self._failed_checks,
+                "timeouts": self._timeouts,
+                "wait_time_seconds": self._wait_time,
+                "max_wait_time_seconds": self._max_wait_time,
+            }
+
+    def _checkout(self, deadline):
+        # An idle connection, or (None, None, None) when a new one may be opened
+        reaped = []
+        try:
+            with self._lock:
+                while True:
+                    reaped.extend(self._reap(time.monotonic()))
+                    if self._idle:
+                        return self._idle.pop()
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None, None, None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No database connection available within {self.timeout}s "
+                                          f"({self.max_size} in use)")
+                    self._waiting += 1
+                    try:
+                        self._lock.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+        finally:
+            for connection in reaped:
+                self._close(connection)
+
+    def _reap(self, now):
+        # Takes the connections idle for longer than max_idle out of the pool, keeping min_size open
+        reaped = []
+        while self._idle and self._size > self.min_size and now - self._idle[0][2] > self.max_idle:
+            reaped.append(self._idle.popleft()[0])
+            self._size -= 1
+            self._closed += 1
+        return reaped
+
+    def _discard(self, connection, created_at):
+        with self._lock:
+            self._size -= 1
+            self._closed += 1
+            self._lock.notify()
+        self._close(connection)
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            logger.warning(msg="Could not close a pooled database connection", exc_info=True)
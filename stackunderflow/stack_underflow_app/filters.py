@@ -0,0 +1,39 @@
+from django_filters import rest_framework as filters
+from stack_underflow_app.models import Question
+from stack_underflow_app.registry import tag_registry
+
+
+def _tag_names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def _tagged_question_ids(tag_ids):
+    # Served by the (tag_id, question_id) index on the through table
+    return Question.tags.through.objects.filter(tag_id__in=tag_ids).values("question_id")
+
+
+class QuestionFilter(filters.FilterSet):
+    tags = filters.CharFilter(method="filter_all_tags", help_text="Comma separated tags, all of them required")
+    tags_any = filters.CharFilter(method="filter_any_tags", help_text="Comma separated tags, any of them required")
+    status = filters.ChoiceFilter(choices=Question.QUESTION_STATUS)
+    closing_remark = filters.ChoiceFilter(choices=Question.QUESTION_CLOSING_REMARK)
+    author = filters.CharFilter(field_name="author__username")
+    created_after = filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="lt")
+
+    class Meta:
+        model = Question
+        fields = ["tags", "tags_any", "status", "closing_remark", "author", "created_after", "created_before"]
+
+    def filter_all_tags(self, queryset, name, value):
+        tag_names = _tag_names(value)
+        tag_ids = tag_registry.find_ids(tag_names)
+        if len(tag_ids) < len(set(tag_names)):
+            return queryset.none()
+        # One subquery per tag rather than joins, so that the rows being ranked by search are never multiplied
+        for tag_id in tag_ids.values():
+            queryset = queryset.filter(id__in=_tagged_question_ids([tag_id]))
+        return queryset
+
+    def filter_any_tags(self, queryset, name, value):
+        return queryset.filter(id__in=_tagged_question_ids(tag_registry.find_ids(_tag_names(value)).values()))
@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger(__name__)
+
+# Slowest queries kept per request for the slow query log
+MAX_SLOW_QUERIES = 10
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST = re.compile(r"\((?:%s|\?)(?:\s*,\s*(?:%s|\?))+\)")
+
+_requests = Local()
+# Number of requests being profiled in this process. Looking up the Local is comparatively slow,
+# so queries skip it while no request is profiled.
+_profiled = 0
+_profiled_lock = threading.Lock()
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    # The query with its literals replaced and IN lists collapsed, so that the same query with
+    # other parameters has the same fingerprint
+    sql = NUMBER_LITERAL.sub("?", STRING_LITERAL.sub("?", sql))
+    return PLACEHOLDER_LIST.sub("(...)", sql)
+
+
+class RequestProfile:
+    # SQL run while serving a sampled request, from any of the threads serving it
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.render_started = None
+        self.serialize_time = 0.0
+        self.serialize_started = None
+        self.serialize_sql_time = 0.0
+        self.serializing = 0
+        self.fingerprints = Counter()
+        self.slow_queries = []
+        self._lock = threading.Lock()
+
+    def record(self, alias, sql, duration):
+        with self._lock:
+            self.queries += 1
+            self.sql_time += duration
+            self.fingerprints[fingerprint(sql)] += 1
+            if duration * 1000 >= settings.SLOW_QUERY_MS:
+                self.slow_queries.append((duration, alias, sql))
+                self.slow_queries.sort(reverse=True)
+                del self.slow_queries[MAX_SLOW_QUERIES:]
+
+    def render_finished(self, response):
+        self.render_time += time.perf_counter() - self.render_started
+
+    def serialize_started_at(self, now):
+        # Serializations may overlap (nested, or on other threads), the time is counted while any of them runs
+        with self._lock:
+            self.serializing += 1
+            if self.serializing == 1:
+                self.serialize_started = now
+                self.serialize_sql_time = self.sql_time
+
+    def serialize_finished_at(self, now):
+        with self._lock:
+            self.serializing -= 1
+            if self.serializing == 0:
+                # Less the queries run meanwhile, which are reported as db time
+                self.serialize_time += now - self.serialize_started - (self.sql_time - self.serialize_sql_time)
+
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+def record_query(execute, sql, params, many, context):
+    profile = getattr(_requests, "profile", None) if _profiled else None
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record(context["connection"].alias, sql, time.perf_counter() - started)
+
+
+@receiver(signal=[connection_created])
+def instrument_connection(sender, connection, **kwargs):
+    # Every connection, whichever thread opens it, reports to the profile of the request it serves if any
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serializing():
+    # Times the serialization run in the block as such in the profile of the request, if it is profiled
+    profile = getattr(_requests, "profile", None) if _profiled else None
+    if profile is None:
+        yield
+        return
+    profile.serialize_started_at(time.perf_counter())
+    try:
+        yield
+    finally:
+        profile.serialize_finished_at(time.perf_counter())
+
+
+def timed_serialization(func):
+    @wraps(func)
+    def serialize(*args, **kwargs):
+        with serializing():
+            return func(*args, **kwargs)
+    return serialize
+
+
+class TimedListSerializer(ListSerializer):
+
+    @property
+    def data(self):
+        with serializing():
+            return super().data
+
+
+class TimedSerializerMixin:
+    # Reports the time taken by .data as serialization. Serializers using it set
+    # Meta.list_serializer_class = TimedListSerializer for the many=True ones.
+
+    @property
+    def data(self):
+        with serializing():
+            return super().data
+
+
+def server_timing(profile, total_time):
+    duplicates = sum(count - 1 for count in profile.fingerprints.values())
+    other_time = total_time - profile.sql_time - profile.render_time - profile.serialize_time
+    metrics = [
+        ("db", profile.sql_time, f"{profile.queries} queries, {duplicates} duplicates"),
+        ("serialize", profile.serialize_time, "serializers, without their queries"),
+        ("render", profile.render_time, "response rendering"),
+        ("app", other_time, "views"),
+        ("total", total_time, None),
+    ]
+    return ", ".join(f'{name};dur={duration * 1000:.1f}' + (f';desc="{desc}"' if desc else "")
+                     for name, duration, desc in metrics)
+
+
+def log_slow(request, response, profile, total_time):
+    view = request.resolver_match.view_name if request.resolver_match else None
+    if total_time * 1000 >= settings.SLOW_REQUEST_MS:
+        logger.warning(msg=json.dumps({
+            "event": "slow_request",
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(total_time * 1000, 1),
+            "db_ms": round(profile.sql_time * 1000, 1),
+            "serialize_ms": round(profile.serialize_time * 1000, 1),
+            "render_ms": round(profile.render_time * 1000, 1),
+            "queries": profile.queries,
+            "duplicates": profile.duplicates(),
+        }))
+    for duration, alias, sql in profile.slow_queries:
+        logger.warning(msg=json.dumps({
+            "event": "slow_query",
+            "view": view,
+            "database": alias,
+            "duration_ms": round(duration * 1000, 1),
+            "sql": fingerprint(sql),
+        }))
+
+
+def start_profile(request):
+    global _profiled
+    profile = request.sql_profile = _requests.profile = RequestProfile()
+    with _profiled_lock:
+        _profiled += 1
+    return profile
+
+
+def end_profile():
+    global _profiled
+    del _requests.profile
+    with _profiled_lock:
+        _profiled -= 1
+
+
+def report(request, response, profile):
+    total_time = time.perf_counter() - profile.started
+    response["Server-Timing"] = server_timing(profile, total_time)
+    log_slow(request, response, profile, total_time)
+
+
+class QueryInstrumentationMiddleware:
+    # Profiles SQL_SAMPLE_RATE of the requests: the number and duration of their queries, repeated queries
+    # (N+1 patterns), and the time spent serializing and rendering, reported in a Server-Timing header and in the
+    # slow request and slow query logs. The other requests only pay for a lookup per query.
+    # Left out of the middleware chain when SQL_SAMPLE_RATE is 0, and async under ASGI.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SQL_SAMPLE_RATE:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Lets Django await this middleware, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        # Connections opened before this module was loaded, at startup
+        for connection in connections.all():
+            instrument_connection(sender=None, connection=connection)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if random.random() >= settings.SQL_SAMPLE_RATE:
+            return self.get_response(request)
+        profile = start_profile(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            end_profile()
+        report(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.SQL_SAMPLE_RATE:
+            return await self.get_response(request)
+        profile = start_profile(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_profile()
+        report(request, response, profile)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        profile = getattr(_requests, "profile", None) if _profiled else None
+        if profile is not None:
+            profile.render_started = time.perf_counter()
+            response.add_post_render_callback(profile.render_finished)
+        return response
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from stack_underflow_app.reputation import aggregate
+
+
+class Command(BaseCommand):
+    help = "Folds new reputation events into users' reputation points and the daily rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep aggregating until interrupted")
+        parser.add_argument("--interval", type=float, default=settings.REPUTATION_AGGREGATION_INTERVAL,
+                            help="Seconds to wait between runs once caught up, with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            # Drain whole batches back to back, only wait once caught up
+            while True:
+                aggregated = aggregate()
+                self.stdout.write(f"Aggregated {aggregated} reputation events")
+                if aggregated < settings.REPUTATION_AGGREGATION_BATCH_SIZE:
+                    break
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(options["interval"])
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from stack_underflow_app.votes import apply_vote_log
+
+
+class Command(BaseCommand):
+    help = "Applies the votes logged in write-behind mode (VOTE_WRITE_BEHIND) to votes, counters and reputation"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep applying until interrupted")
+        parser.add_argument("--interval", type=float, default=settings.VOTE_LOG_APPLY_INTERVAL,
+                            help="Seconds to wait between runs once caught up, with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            # Drain whole batches back to back, only wait once caught up
+            while True:
+                applied = apply_vote_log()
+                self.stdout.write(f"Applied {applied} logged votes")
+                if applied < settings.VOTE_LOG_BATCH_SIZE:
+                    break
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(options["interval"])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from stack_underflow_app.models import Question
+from stack_underflow_app.search import index_question
+
+
+class Command(BaseCommand):
+    help = "Indexes every question for full-text search, eg. after upgrading an existing database"
+
+    def handle(self, *args, **options):
+        indexed = 0
+        for question_id in Question.objects.values_list("id", flat=True).iterator():
+            index_question(question_id)
+            indexed += 1
+        self.stdout.write(f"Indexed {indexed} questions")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from stack_underflow_app.models import POST_TYPE_MODELS, Votes
+
+
+def vote_count(post_type_name, **vote_filter):
+    votes = (
+        Votes.objects.filter(post_type__name=post_type_name, post_id=OuterRef("pk"), **vote_filter)
+        .order_by()
+        .values("post_id")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return Coalesce(Subquery(votes, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the vote counters of questions, answers and comments from the Votes table"
+
+    def handle(self, *args, **options):
+        for post_type_name, model in POST_TYPE_MODELS.items():
+            # One set-based UPDATE per post type, run in a transaction so readers never see
+            # upvote_count/downvote_count out of step with score
+            with transaction.atomic():
+                updated = model.objects.update(upvote_count=vote_count(post_type_name, upvote=True),
+                                               downvote_count=vote_count(post_type_name, downvote=True))
+                model.objects.update(score=F("upvote_count") - F("downvote_count"))
+            self.stdout.write(f"Rebuilt vote counters of {updated} {model.__name__} rows")
@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from stack_underflow_app.rankings import recompute_rankings
+
+
+class Command(BaseCommand):
+    help = "Recomputes the feed scores of the questions with activity since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep recomputing until interrupted")
+        parser.add_argument("--interval", type=float, default=settings.RANKING_INTERVAL,
+                            help="Seconds to wait between runs, with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            recomputed = recompute_rankings()
+            self.stdout.write(f"Recomputed the rankings of {recomputed} questions")
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(options["interval"])
@@ -0,0 +1,99 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from stack_underflow_app.bulk import chunks
+from stack_underflow_app.models import (POST_TYPE_MODELS, ReputationEvent,
+                                        User, Votes)
+from stack_underflow_app.registry import post_type_registry
+from stack_underflow_app.reputation import REPUTATION_PER_VOTE, record_events
+
+MAX_EVENT_DELTA = 32000
+
+
+def correction_events(user_id, delta):
+    # ReputationEvent.delta is a small integer, large corrections are split over several events
+    events = []
+    while delta:
+        step = max(min(delta, MAX_EVENT_DELTA), -MAX_EVENT_DELTA)
+        events.append(ReputationEvent(user_id=user_id, delta=step, cause=ReputationEvent.CORRECTION))
+        delta -= step
+    return events
+
+
+class Command(BaseCommand):
+    help = "Recomputes users' reputation from the Votes table and records corrections for the ones that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=10000,
+                            help="Rows fetched from the server side cursors at a time")
+        parser.add_argument("--dry-run", action="store_true", help="Only print the differences")
+
+    def expected_reputation(self, chunk_size):
+        # Streams the votes and resolves the authors of each chunk with one query per post type.
+        # Only one chunk of votes is held at a time, memory grows with the number of authors.
+        expected = defaultdict(int)
+        streamed = 0
+        votes = (
+            Votes.objects.filter(post_type__isnull=False)
+            .order_by()
+            .values_list("post_type_id", "post_id", "upvote", "downvote")
+        )
+        for chunk in chunks(votes.iterator(chunk_size=chunk_size), chunk_size):
+            post_ids = defaultdict(set)
+            for post_type_id, post_id, _, _ in chunk:
+                post_ids[post_type_id].add(post_id)
+            authors = {}
+            for post_type_id, ids in post_ids.items():
+                model = POST_TYPE_MODELS[post_type_registry.name_for(post_type_id)]
+                for post_id, author_id in model.objects.filter(id__in=ids).values_list("id", "author_id"):
+                    authors[(post_type_id, post_id)] = author_id
+            for post_type_id, post_id, upvote, downvote in chunk:
+                author_id = authors.get((post_type_id, post_id))
+                if author_id is not None:
+                    expected[author_id] += REPUTATION_PER_VOTE * (upvote - downvote)
+            streamed += len(chunk)
+        return expected, streamed
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # Votes, users and the ledger are all read from the same snapshot, so votes cast
+                # while the command runs neither count twice nor get corrected away
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            expected, streamed = self.expected_reputation(options["chunk_size"])
+            # reputation_points lags the ledger, the events the aggregator has not folded in yet count too
+            pending = dict(
+                ReputationEvent.objects.filter(aggregated=False)
+                .order_by()
+                .values_list("user_id")
+                .annotate(delta=Sum("delta"))
+            )
+            users = User.objects.order_by("id").values_list("id", "username", "reputation_points")
+            checked = corrected = 0
+            for chunk in chunks(users.iterator(chunk_size=options["chunk_size"]), options["chunk_size"]):
+                corrections = []
+                for user_id, username, reputation_points in chunk:
+                    actual = reputation_points + pending.get(user_id, 0)
+                    # Downvotes never take reputation below zero. The order of the votes is not known,
+                    # so a downvote the floor once skipped is not told apart from one it should have.
+                    target = max(expected.get(user_id, 0), 0)
+                    if actual != target:
+                        self.stdout.write(f"{username} (id {user_id}): {actual} -> {target} ({target - actual:+d})")
+                        corrections.append((user_id, target - actual))
+                checked += len(chunk)
+                if not options["dry_run"]:
+                    record_events([event for user_id, delta in corrections
+                                   for event in correction_events(user_id, delta)])
+                corrected += len(corrections)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Streamed {streamed} votes and checked {checked} users in {elapsed:.1f}s "
+            f"({streamed / elapsed if elapsed else 0:.0f} votes/s), "
+            + (f"{corrected} users would be corrected" if options["dry_run"]
+               else f"recorded {corrected} corrections for the reputation aggregator")
+        )
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+import time
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from stack_underflow_app.db_pool.base import pool_stats
+
+# Prometheus metrics. When PROMETHEUS_MULTIPROC_DIR is set (it has to be before the workers start), every
+# worker process writes its metrics to files in that directory and /metrics aggregates all of them.
+
+REQUEST_DURATION = Histogram("stackunderflow_request_duration_seconds", "Time taken to serve requests",
+                             ["route", "method"])
+REQUESTS = Counter("stackunderflow_requests_total", "Requests served", ["route", "action", "method", "status"])
+REQUEST_DB_QUERIES = Histogram("stackunderflow_request_db_queries", "Database queries per request, of the requests "
+                               "profiled by the SQL instrumentation", ["route"],
+                               buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144))
+
+VOTES = Counter("stackunderflow_votes_total", "Votes cast", ["post_type", "direction"])
+POSTS_CREATED = Counter("stackunderflow_posts_created_total", "Questions, answers and comments posted", ["post_type"])
+
+CACHE_LOOKUPS = Counter("stackunderflow_cache_lookups_total", "Cache lookups", ["cache", "result"])
+
+DB_POOL_CONNECTIONS = Gauge("stackunderflow_db_pool_connections", "Pooled database connections (waiting: requests "
+                            "waiting for one)", ["database", "state"], multiprocess_mode="livesum")
+DB_POOL_CHECKOUTS = Counter("stackunderflow_db_pool_checkouts_total", "Connections taken from the pool", ["database"])
+DB_POOL_TIMEOUTS = Counter("stackunderflow_db_pool_timeouts_total", "Requests that got no connection in time",
+                           ["database"])
+DB_POOL_WAIT = Counter("stackunderflow_db_pool_wait_seconds_total", "Time spent waiting for a connection",
+                       ["database"])
+
+_pool_totals = {}
+_pool_totals_lock = threading.Lock()
+
+
+def count_votes(clicks):
+    # Vote clicks as (post type name, upvote)
+    for post_type, upvote in clicks:
+        VOTES.labels(post_type, "up" if upvote else "down").inc()
+
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_pool_stats():
+    # The pool keeps running totals, the counters get what was added since the last call
+    with _pool_totals_lock:
+        for alias, stats in pool_stats().items():
+            for state in ("idle", "in_use", "waiting"):
+                DB_POOL_CONNECTIONS.labels(alias, state).set(stats[state])
+            last = _pool_totals.get(alias, {})
+            for counter, key in ((DB_POOL_CHECKOUTS, "checkouts"), (DB_POOL_TIMEOUTS, "timeouts"),
+                                 (DB_POOL_WAIT, "wait_time_seconds")):
+                counter.labels(alias).inc(stats[key] - last.get(key, 0))
+            _pool_totals[alias] = stats
+
+
+def metrics_view(request):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def record_request(request, response, duration):
+    match = request.resolver_match
+    route = match.view_name if match else "unmatched"
+    action = getattr(match.func, "actions", {}).get(request.method.lower(), "") if match else ""
+    REQUEST_DURATION.labels(route, request.method).observe(duration)
+    REQUESTS.labels(route, action, request.method, response.status_code).inc()
+    profile = getattr(request, "sql_profile", None)
+    if profile is not None:
+        REQUEST_DB_QUERIES.labels(route).observe(profile.queries)
+    record_pool_stats()
+
+
+class MetricsMiddleware:
+    # Request latency and counts by route (URL name) and viewset action, and the connection pool stats
+    # as of the end of the request. Async under ASGI.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Lets Django await this middleware, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        record_request(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        record_request(request, response, time.perf_counter() - started)
+        return response
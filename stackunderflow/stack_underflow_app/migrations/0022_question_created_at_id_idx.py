@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stack_underflow_app', '0021_remove_tag_description'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-created_at', '-id'], name='question_created_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stack_underflow_app', '0022_question_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='downvote_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='number of downvotes'),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='score',
+            field=models.IntegerField(default=0, editable=False, verbose_name='upvotes minus downvotes'),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='upvote_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='number of upvotes'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='downvote_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='number of downvotes'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='score',
+            field=models.IntegerField(default=0, editable=False, verbose_name='upvotes minus downvotes'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='upvote_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='number of upvotes'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='downvote_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='number of downvotes'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='score',
+            field=models.IntegerField(default=0, editable=False, verbose_name='upvotes minus downvotes'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='upvote_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='number of upvotes'),
+        ),
+    ]
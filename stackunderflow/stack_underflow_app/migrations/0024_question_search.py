@@ -0,0 +1,46 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:17
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# GinIndex cannot be declared on the model since the app also runs on SQLite locally
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX question_search_vector_idx ON stack_underflow_app_question USING gin (search_vector)'
+        )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS question_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stack_underflow_app', '0023_vote_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='full-text search document'),
+        ),
+        migrations.CreateModel(
+            name='QuestionSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50, verbose_name='search term')),
+                ('weight', models.IntegerField(verbose_name='weighted number of occurrences')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='stack_underflow_app.question')),
+            ],
+            options={
+                'unique_together': {('term', 'question')},
+            },
+        ),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
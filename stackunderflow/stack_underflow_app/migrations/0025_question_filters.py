@@ -0,0 +1,51 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:18
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_tagged_questions(apps, schema_editor):
+    Tag = apps.get_model('stack_underflow_app', 'Tag')
+    Question = apps.get_model('stack_underflow_app', 'Question')
+    counts = (
+        Question.tags.through.objects.filter(tag_id=OuterRef('pk'))
+        .order_by()
+        .values('tag_id')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    Tag.objects.update(question_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stack_underflow_app', '0024_question_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='question_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='number of tagged questions'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['status', '-created_at'], name='question_status_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['author', '-created_at'], name='question_author_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-question_count', 'name'], name='tag_question_count_idx'),
+        ),
+        # The auto-created through table only has a (question_id, tag_id) index for tag lookups by question
+        migrations.RunSQL(
+            'CREATE INDEX question_tags_tag_question_idx ON stack_underflow_app_question_tags (tag_id, question_id)',
+            'DROP INDEX question_tags_tag_question_idx',
+        ),
+        migrations.RunPython(count_tagged_questions, migrations.RunPython.noop),
+    ]
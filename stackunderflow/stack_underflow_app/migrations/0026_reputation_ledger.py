@@ -0,0 +1,47 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stack_underflow_app', '0025_question_filters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AggregationCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='aggregation job name')),
+                ('position', models.BigIntegerField(default=0, verbose_name='last processed id')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReputationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.SmallIntegerField(verbose_name='change in reputation points')),
+                ('cause', models.CharField(choices=[('UPVOTE', 'Post upvoted'), ('DOWNVOTE', 'Post downvoted'), ('UPVOTE_REMOVED', 'Upvote removed'), ('DOWNVOTE_REMOVED', 'Downvote removed'), ('CORRECTION', 'Correction')], max_length=16, verbose_name='cause of the change')),
+                ('post_id', models.BigIntegerField(null=True, verbose_name='post id')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='change recorded at')),
+                ('post_type', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='stack_underflow_app.posttype')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReputationDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('delta', models.IntegerField(default=0, verbose_name='change in reputation points')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stack_underflow_app', '0026_reputation_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField(verbose_name='post id')),
+                ('upvote', models.BooleanField(null=True, verbose_name='Is upvote')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='logged at')),
+                ('post_type', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='stack_underflow_app.posttype')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='votelogentry',
+            index=models.Index(fields=['user', 'post_id'], name='votelog_user_post_idx'),
+        ),
+    ]
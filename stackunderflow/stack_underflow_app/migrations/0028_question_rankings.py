@@ -0,0 +1,67 @@
+# Generated by Django 3.2.16 on 2026-10-18 11:31
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def stamp_last_activity(apps, schema_editor):
+    # The latest known activity of existing questions is their last edit
+    Question = apps.get_model('stack_underflow_app', 'Question')
+    Question.objects.update(last_activity_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stack_underflow_app', '0027_vote_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='hot feed score'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='last activity at'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='month_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='month feed score'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='trending feed score'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='week_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='week feed score'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-hot_score', '-id'], name='question_hot_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-trending_score', '-id'], name='question_trending_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-week_score', '-id'], name='question_week_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-month_score', '-id'], name='question_month_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['last_activity_at'], name='question_last_activity_at_idx'),
+        ),
+        migrations.RunPython(stamp_last_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+def mark_aggregated_events(apps, schema_editor):
+    # The events up to the position of the former aggregation cursor were folded in already
+    AggregationCursor = apps.get_model('stack_underflow_app', 'AggregationCursor')
+    ReputationEvent = apps.get_model('stack_underflow_app', 'ReputationEvent')
+    position = AggregationCursor.objects.filter(name='reputation').values_list('position', flat=True).first()
+    if position:
+        ReputationEvent.objects.filter(id__lte=position).update(aggregated=True)
+    AggregationCursor.objects.filter(name='reputation').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stack_underflow_app', '0028_question_rankings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reputationevent',
+            name='aggregated',
+            field=models.BooleanField(default=False, verbose_name='folded into the reputation'),
+        ),
+        migrations.RunPython(mark_aggregated_events, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reputationevent',
+            index=models.Index(condition=models.Q(('aggregated', False)), fields=['id'], name='reputation_event_pending_idx'),
+        ),
+    ]
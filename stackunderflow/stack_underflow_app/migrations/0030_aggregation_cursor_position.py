@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stack_underflow_app', '0029_reputation_event_aggregated'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='aggregationcursor',
+            name='name',
+            field=models.CharField(max_length=30, unique=True, verbose_name='background job name'),
+        ),
+        migrations.AlterField(
+            model_name='aggregationcursor',
+            name='position',
+            field=models.BigIntegerField(default=0, verbose_name='position of the job in its input'),
+        ),
+    ]
@@ -1,10 +1,20 @@
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import ASCIIUsernameValidator
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 
 
 class Tag(models.Model):
+    class Meta:
+        indexes = [
+            # Backs the tag popularity listing
+            models.Index(fields=["-question_count", "name"], name="tag_question_count_idx"),
+        ]
+
     name = models.CharField("tag name", max_length=10, blank=False, null=False, unique=True, db_index=True)
+    # Maintained by the Question.tags m2m_changed handler, see signals.py
+    question_count = models.IntegerField("number of tagged questions", default=0, editable=False)
 
 
 class User(AbstractUser):
@@ -47,6 +57,21 @@ class PostType(models.Model):
 
 
 class Question(models.Model):
+    class Meta:
+        indexes = [
+            # Backs the keyset pagination of the questions list
+            models.Index(fields=["-created_at", "-id"], name="question_created_at_id_idx"),
+            # Back the status and author filters of the questions list
+            models.Index(fields=["status", "-created_at"], name="question_status_created_at_idx"),
+            models.Index(fields=["author", "-created_at"], name="question_author_created_at_idx"),
+            # Back the feeds (see rankings.py) and finding the questions whose rankings are stale
+            models.Index(fields=["-hot_score", "-id"], name="question_hot_score_idx"),
+            models.Index(fields=["-trending_score", "-id"], name="question_trending_score_idx"),
+            models.Index(fields=["-week_score", "-id"], name="question_week_score_idx"),
+            models.Index(fields=["-month_score", "-id"], name="question_month_score_idx"),
+            models.Index(fields=["last_activity_at"], name="question_last_activity_at_idx"),
+        ]
+
     OPEN = "OPEN"
     CLOSED = "CLOSED"
 
@@ -79,18 +104,25 @@ class Question(models.Model):
     created_at = models.DateTimeField("question posted at", auto_now_add=True)
     updated_at = models.DateTimeField("question updated at", auto_now=True)
     tags = models.ManyToManyField(Tag)
+    upvote_count = models.IntegerField("number of upvotes", default=0, editable=False)
+    downvote_count = models.IntegerField("number of downvotes", default=0, editable=False)
+    score = models.IntegerField("upvotes minus downvotes", default=0, editable=False)
+    # Full-text search document on PostgreSQL, see search.py. Indexed with GIN by migration 0024.
+    search_vector = SearchVectorField("full-text search document", null=True, editable=False)
+    # Stamped on votes, answers and views, the feed scores are recomputed from it by the rankings job
+    last_activity_at = models.DateTimeField("last activity at", default=timezone.now, editable=False)
+    hot_score = models.FloatField("hot feed score", default=0, editable=False)
+    trending_score = models.FloatField("trending feed score", default=0, editable=False)
+    week_score = models.FloatField("week feed score", default=0, editable=False)
+    month_score = models.FloatField("month feed score", default=0, editable=False)
 
     @property
     def upvotes(self):
-        return len(Votes.objects.filter(post_id=self.id,
-                                        post_type=PostType.objects.get(name=PostType.QUES),
-                                        upvote=True))
+        return self.upvote_count
 
     @property
     def downvotes(self):
-        return len(Votes.objects.filter(post_id=self.id,
-                                        post_type=PostType.objects.get(name=PostType.QUES),
-                                        downvote=True))
+        return self.downvote_count
 
     @property
     def accepted_answer(self):
@@ -108,18 +140,17 @@ class Answer(models.Model):
     created_at = models.DateTimeField("answer posted at", auto_now_add=True)
     updated_at = models.DateTimeField("answer updated at", auto_now=True)
     is_accepted = models.BooleanField("is accepted answer", default=False)
+    upvote_count = models.IntegerField("number of upvotes", default=0, editable=False)
+    downvote_count = models.IntegerField("number of downvotes", default=0, editable=False)
+    score = models.IntegerField("upvotes minus downvotes", default=0, editable=False)
 
     @property
     def upvotes(self):
-        return len(Votes.objects.filter(post_id=self.id,
-                                        post_type=PostType.objects.get(name=PostType.ANS),
-                                        upvote=True))
+        return self.upvote_count
 
     @property
     def downvotes(self):
-        return len(Votes.objects.filter(post_id=self.id,
-                                        post_type=PostType.objects.get(name=PostType.ANS),
-                                        downvote=True))
+        return self.downvote_count
 
 
 class Comment(models.Model):
@@ -129,18 +160,17 @@ class Comment(models.Model):
     author = models.ForeignKey(to=User, on_delete=models.CASCADE)
     created_at = models.DateTimeField("comment posted at", auto_now_add=True)
     updated_at = models.DateTimeField("comment updated at", auto_now=True)
+    upvote_count = models.IntegerField("number of upvotes", default=0, editable=False)
+    downvote_count = models.IntegerField("number of downvotes", default=0, editable=False)
+    score = models.IntegerField("upvotes minus downvotes", default=0, editable=False)
 
     @property
     def upvotes(self):
-        return len(Votes.objects.filter(post_id=self.id,
-                                        post_type=PostType.objects.get(name=PostType.COMT),
-                                        upvote=True))
+        return self.upvote_count
 
     @property
     def downvotes(self):
-        return len(Votes.objects.filter(post_id=self.id,
-                                        post_type=PostType.objects.get(name=PostType.COMT),
-                                        downvote=True))
+        return self.downvote_count
 
 
 class Votes(models.Model):
@@ -152,3 +182,85 @@ class Votes(models.Model):
     user = models.ForeignKey(to=User, on_delete=models.CASCADE)
     upvote = models.BooleanField("Is upvote")
     downvote = models.BooleanField("Is downvote")
+
+
+class VoteLogEntry(models.Model):
+    # Write-behind log of votes (VOTE_WRITE_BEHIND), each entry holding the vote a user has after a click:
+    # True (upvote), False (downvote) or None (removed). Applied to Votes and deleted by the vote log applier
+    # (see votes.py)
+    class Meta:
+        indexes = [models.Index(fields=["user", "post_id"], name="votelog_user_post_idx")]
+
+    user = models.ForeignKey(to=User, on_delete=models.CASCADE, db_index=False)
+    post_type = models.ForeignKey(to=PostType, on_delete=models.CASCADE, db_index=False)
+    post_id = models.BigIntegerField("post id")
+    upvote = models.BooleanField("Is upvote", null=True)
+    created_at = models.DateTimeField("logged at", auto_now_add=True)
+
+
+class QuestionSearchTerm(models.Model):
+    # Inverted index standing in for search_vector on databases other than PostgreSQL
+    class Meta:
+        unique_together = (("term", "question"),)
+
+    term = models.CharField("search term", max_length=50)
+    question = models.ForeignKey(to=Question, on_delete=models.CASCADE)
+    weight = models.IntegerField("weighted number of occurrences")
+
+
+# Model holding the posts of each PostType
+POST_TYPE_MODELS = {
+    PostType.QUES: Question,
+    PostType.ANS: Answer,
+    PostType.COMT: Comment,
+}
+
+
+class ReputationEvent(models.Model):
+    # Append-only ledger of reputation changes, folded into User.reputation_points and
+    # ReputationDaily by the reputation aggregator (see reputation.py)
+    UPVOTE = "UPVOTE"
+    DOWNVOTE = "DOWNVOTE"
+    UPVOTE_REMOVED = "UPVOTE_REMOVED"
+    DOWNVOTE_REMOVED = "DOWNVOTE_REMOVED"
+    CORRECTION = "CORRECTION"
+
+    CAUSES = [
+        (UPVOTE, "Post upvoted"),
+        (DOWNVOTE, "Post downvoted"),
+        (UPVOTE_REMOVED, "Upvote removed"),
+        (DOWNVOTE_REMOVED, "Downvote removed"),
+        (CORRECTION, "Correction"),
+    ]
+
+    class Meta:
+        # The aggregator only reads the events it has not folded in yet, in id order
+        indexes = [
+            models.Index(fields=["id"], name="reputation_event_pending_idx", condition=models.Q(aggregated=False)),
+        ]
+
+    user = models.ForeignKey(to=User, on_delete=models.CASCADE, db_index=False)
+    delta = models.SmallIntegerField("change in reputation points")
+    cause = models.CharField("cause of the change", max_length=16, choices=CAUSES)
+    post_type = models.ForeignKey(to=PostType, on_delete=models.SET_NULL, null=True, db_index=False)
+    post_id = models.BigIntegerField("post id", null=True)
+    created_at = models.DateTimeField("change recorded at", auto_now_add=True)
+    aggregated = models.BooleanField("folded into the reputation", default=False)
+
+
+class ReputationDaily(models.Model):
+    # Reputation gained (or lost) by a user per day, rolled up from ReputationEvent
+    class Meta:
+        unique_together = (("user", "day"),)
+
+    user = models.ForeignKey(to=User, on_delete=models.CASCADE)
+    day = models.DateField("day")
+    delta = models.IntegerField("change in reputation points", default=0)
+
+
+class AggregationCursor(models.Model):
+    # One row per background job stream, which it locks to run alone. What `position` holds is up to the job:
+    # the start of its last run in microseconds since EPOCH for the rankings, the last applied entry id for the
+    # vote log.
+    name = models.CharField("background job name", max_length=30, unique=True)
+    position = models.BigIntegerField("position of the job in its input", default=0)
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (CursorPagination, PageNumberPagination,
+                                       _reverse_ordering)
+from stack_underflow_app.rankings import FEEDS
+
+
+class QuestionCursorPagination(CursorPagination):
+    # Newest questions first, or highest feed score first with ?feed= (see rankings.py), "id" breaking ties.
+    # Unlike DRF's cursors, which hold the value of the first ordering field and an offset among the rows
+    # sharing it, these hold both fields and a page starts right after that (value, id) pair. So questions
+    # posted at the same instant are neither skipped nor repeated when others are inserted meanwhile.
+    ordering = ("-created_at", "-id")
+    page_size = settings.QUESTIONS_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.QUESTIONS_MAX_PAGE_SIZE
+
+    POSITION_SEPARATOR = "|"
+
+    def get_ordering(self, request, queryset, view):
+        feed = FEEDS.get(request.query_params.get("feed"))
+        if feed:
+            return ("-" + feed.field, "-id")
+        return self.ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = super()._get_position_from_instance
+        return self.POSITION_SEPARATOR.join(position(instance, (field,)) for field in ordering)
+
+    def _following_rows(self, position, reverse):
+        # The rows past the (value, id) position in the order being paged
+        value, _, pk = position.rpartition(self.POSITION_SEPARATOR)
+        if not pk.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        field, tie_breaker = self.ordering
+        lookups = ["lt" if order.startswith("-") != reverse else "gt" for order in self.ordering]
+        field, tie_breaker = field.lstrip("-"), tie_breaker.lstrip("-")
+        return Q(**{f"{field}__{lookups[0]}": value}) | Q(**{field: value, f"{tie_breaker}__{lookups[1]}": int(pk)})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # As CursorPagination.paginate_queryset, filtering on both fields of the position
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(self._following_rows(current_position, reverse))
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        # One more row tells whether there is a page following this one
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = self._get_position_from_instance(results[-1], self.ordering) if has_following_position \
+            else None
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position, self.previous_position = current_position, following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position, self.previous_position = following_position, current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class SearchPagination(PageNumberPagination):
+    # Search results are ordered by relevance, which has no stable key to build cursors on
+    page_size = settings.QUESTIONS_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.QUESTIONS_MAX_PAGE_SIZE
@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.db.models import Prefetch, Q
+from stack_underflow_app.models import Answer, Comment, PostType, Question, Tag
+from stack_underflow_app.registry import post_type_registry
+
+
+# Answers with their author loaded in the same query
+def answer_read_queryset():
+    return Answer.objects.select_related("author").order_by("id")
+
+
+# Questions with everything QuestionSerializer renders, fetched with one query per relation.
+# The async views load the answers concurrently instead.
+def question_read_queryset(with_answers=True):
+    queryset = Question.objects.select_related("author").prefetch_related(Prefetch("tags", Tag.objects.order_by("id")))
+    if with_answers:
+        queryset = queryset.prefetch_related(Prefetch("answer_set", queryset=answer_read_queryset()))
+    return queryset
+
+
+# Id of the question a post belongs to, following a comment to the post it is on
+def question_id_for_post(post_type_id, post_id):
+    post_type = post_type_registry.name_for(post_type_id)
+    if post_type == PostType.QUES:
+        return post_id
+    if post_type == PostType.ANS:
+        return Answer.objects.filter(id=post_id).values_list("question_id", flat=True).first()
+    if post_type == PostType.COMT:
+        comment_post = Comment.objects.filter(id=post_id).values_list("post_type_id", "post_id").first()
+        if comment_post:
+            return question_id_for_post(*comment_post)
+    return None
+
+
+# Ids of the questions the given (post type id, post id) posts belong to, with one query per post type
+def question_ids_for_posts(posts):
+    post_ids = defaultdict(set)
+    for post_type_id, post_id in posts:
+        post_ids[post_type_registry.name_for(post_type_id)].add(post_id)
+    if post_ids[PostType.COMT]:
+        comment_posts = Comment.objects.filter(id__in=post_ids[PostType.COMT]).values_list("post_type_id", "post_id")
+        for post_type_id, post_id in comment_posts:
+            post_ids[post_type_registry.name_for(post_type_id)].add(post_id)
+    question_ids = set(post_ids[PostType.QUES])
+    if post_ids[PostType.ANS]:
+        question_ids.update(Answer.objects.filter(id__in=post_ids[PostType.ANS]).values_list("question_id", flat=True))
+    return question_ids
+
+
+# Bulk loads the comments of the given posts in one query, keyed by (post type name, post id)
+def load_comments(question_ids=(), answer_ids=()):
+    comments_by_post = defaultdict(list)
+    if not question_ids and not answer_ids:
+        return comments_by_post
+    comments = (
+        Comment.objects.filter(Q(post_type_id=post_type_registry.id_for(PostType.QUES), post_id__in=question_ids)
+                               | Q(post_type_id=post_type_registry.id_for(PostType.ANS), post_id__in=answer_ids))
+        .select_related("author")
+        .order_by("id")
+    )
+    for comment in comments:
+        comments_by_post[(post_type_registry.name_for(comment.post_type_id), comment.post_id)].append(comment)
+    return comments_by_post
+
+
+# Bulk loads the comments of the given questions and of their (prefetched) answers
+def load_question_comments(questions):
+    question_ids = [question.id for question in questions]
+    answer_ids = [answer.id for question in questions for answer in question.answer_set.all()]
+    return load_comments(question_ids=question_ids, answer_ids=answer_ids)
@@ -0,0 +1,87 @@
+import logging
+import math
+from collections import namedtuple
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from stack_underflow_app.bulk import chunks
+from stack_underflow_app.models import AggregationCursor, Question
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = "rankings"
+
+# Activity of a question: its score, plus ANSWER_WEIGHT per answer and a point per VIEWS_PER_POINT views
+ANSWER_WEIGHT = 2
+VIEWS_PER_POINT = 50
+# Reference instant of the time anchors, keeps the scores small
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+
+# A feed ranks questions by log10(activity) + anchor / decay, where the anchor is a timestamp in seconds:
+# a question needs ten times the activity to rank level with one anchored `decay` seconds later.
+# As the decay is carried by the anchor instead of the current time, a score only changes along with
+# the question's activity, so only questions touched since the last run need recomputing.
+# Feeds with a window only list questions posted within it.
+Feed = namedtuple("Feed", ["field", "anchor", "decay", "window"])
+
+FEEDS = {
+    "hot": Feed("hot_score", "created_at", 45000, None),
+    "trending": Feed("trending_score", "last_activity_at", 45000, None),
+    "week": Feed("week_score", "created_at", 7 * 86400, timedelta(days=7)),
+    "month": Feed("month_score", "created_at", 30 * 86400, timedelta(days=30)),
+}
+
+
+def feed_score(feed, activity, anchor):
+    order = math.log10(max(abs(activity), 1))
+    sign = (activity > 0) - (activity < 0)
+    return sign * order + (anchor - EPOCH).total_seconds() / feed.decay
+
+
+def feed_queryset(queryset, feed_name):
+    feed = FEEDS[feed_name]
+    if feed.window:
+        queryset = queryset.filter(created_at__gte=timezone.now() - feed.window)
+    return queryset
+
+
+def rankings_version():
+    # Changes whenever the rankings are recomputed, part of the ETag of the feeds
+    return AggregationCursor.objects.filter(name=CURSOR_NAME).values_list("position", flat=True).first() or 0
+
+
+def recompute_rankings(batch_size=None, lag=None):
+    # Recomputes the feed scores of the questions with activity since the last run. Runs overlap by `lag`
+    # seconds, activity is stamped before its transaction commits and could otherwise be missed.
+    # Recomputing a question twice is harmless. Returns the number of questions recomputed.
+    batch_size = batch_size or settings.RANKING_BATCH_SIZE
+    lag = settings.RANKING_LAG if lag is None else lag
+    with transaction.atomic():
+        cursor, _ = AggregationCursor.objects.select_for_update().get_or_create(name=CURSOR_NAME)
+        started = timezone.now()
+        touched = Question.objects.order_by().values_list("id", flat=True)
+        if cursor.position:
+            # The position of this job is the start of its last run, in microseconds since EPOCH
+            since = EPOCH + timedelta(microseconds=cursor.position) - timedelta(seconds=lag)
+            touched = touched.filter(last_activity_at__gte=since)
+        recomputed = 0
+        for ids in chunks(touched.iterator(chunk_size=batch_size), batch_size):
+            questions = list(
+                Question.objects.filter(id__in=ids)
+                .annotate(answer_count=Count("answer"))
+                .only("id", "score", "viewcount", "created_at", "last_activity_at")
+            )
+            for question in questions:
+                activity = question.score + ANSWER_WEIGHT * question.answer_count + question.viewcount / VIEWS_PER_POINT
+                for feed in FEEDS.values():
+                    setattr(question, feed.field, feed_score(feed, activity, getattr(question, feed.anchor)))
+            Question.objects.bulk_update(questions, [feed.field for feed in FEEDS.values()])
+            recomputed += len(questions)
+        cursor.position = (started - EPOCH) // timedelta(microseconds=1)
+        cursor.save(update_fields=["position"])
+    logger.info(msg=f"Recomputed the rankings of {recomputed} questions")
+    return recomputed
@@ -0,0 +1,178 @@
+import json
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponse
+from stack_underflow_app.instrumentation import timed_serialization
+from stack_underflow_app.models import Answer, Comment, PostType, Tag
+from stack_underflow_app.registry import post_type_registry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Read only serialization of questions, answers, comments and tags straight from values() rows, for the
+# read endpoints listed in FAST_READ_ENDPOINTS. The output is the same, byte for byte, as the one of
+# QuestionSerializer, AnswerSerializer, CommentSerializer and TagSerializer rendered by JSONRenderer.
+
+
+def fast_read_enabled(request):
+    return request.resolver_match.url_name in settings.FAST_READ_ENDPOINTS
+
+
+def render_json(data):
+    # JSONRenderer's bytes for data made of dicts, lists, str, int, bool and None
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    # JSONRenderer escapes the line and paragraph separators, which are not valid in JavaScript strings
+    return body.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+def payload_response(data):
+    return HttpResponse(render_json(data), content_type="application/json")
+
+
+def datetime_value(value):
+    # As DRF's JSONEncoder renders the datetimes of ReadOnlyFields
+    if value is None:
+        return None
+    representation = value.isoformat()
+    if representation.endswith("+00:00"):
+        return representation[:-6] + "Z"
+    return representation
+
+
+def converted(getter, converter):
+    return lambda row: converter(getter(row))
+
+
+class RowFormat:
+    # Output fields of a serializer, in its order, as (name, values() lookup) or (name, lookup, converter).
+    # Fields without a lookup are nested lists, passed to `build` as keyword arguments of the same name.
+
+    def __init__(self, fields):
+        self.lookups = [field[1] for field in fields if field[1] is not None]
+        # (name, getter of the value from the row), without a getter for the nested fields
+        self.getters = []
+        for name, lookup, *converter in fields:
+            getter = None if lookup is None else itemgetter(lookup)
+            if converter:
+                getter = converted(getter, converter[0])
+            self.getters.append((name, getter))
+
+    def build(self, row, **nested):
+        return {name: nested[name] if getter is None else getter(row) for name, getter in self.getters}
+
+
+TAG = RowFormat([
+    ("id", "id"),
+    ("name", "name"),
+])
+
+COMMENT = RowFormat([
+    ("id", "id"),
+    ("body", "body"),
+    ("author", "author__username"),
+    ("post_id", "post_id"),
+    ("created_at", "created_at", datetime_value),
+    ("updated_at", "updated_at", datetime_value),
+])
+
+ANSWER = RowFormat([
+    ("id", "id"),
+    ("created_at", "created_at", datetime_value),
+    ("updated_at", "updated_at", datetime_value),
+    ("upvotes", "upvote_count"),
+    ("downvotes", "downvote_count"),
+    ("comments", None),
+    ("answer_body", "answer_body"),
+    ("is_accepted", "is_accepted"),
+    ("score", "score"),
+    ("question", "question_id"),
+    ("author", "author_id"),
+])
+
+QUESTION = RowFormat([
+    ("id", "id"),
+    ("tags", None),
+    ("created_at", "created_at", datetime_value),
+    ("updated_at", "updated_at", datetime_value),
+    ("upvotes", "upvote_count"),
+    ("downvotes", "downvote_count"),
+    ("viewcount", "viewcount"),
+    ("status", "status"),
+    ("author", "author__username"),
+    ("closing_remark", "closing_remark"),
+    ("answers", None),
+    ("comments", None),
+    ("title", "title"),
+    ("description", "description"),
+    ("score", "score"),
+])
+
+
+def question_values(questions, ordering=()):
+    # values() rows of the questions for question_payloads, with the fields of the given ordering
+    # for the cursor paginator to read its positions from
+    fields = [field.lstrip("-") for field in ordering]
+    lookups = QUESTION.lookups + [field for field in fields if field not in QUESTION.lookups]
+    return questions.select_related(None).prefetch_related(None).values(*lookups)
+
+
+def comment_payloads_by_post(comments):
+    # Payloads of the given comments keyed by (post type name, post id), in id order
+    payloads = defaultdict(list)
+    for row in comments.order_by("id").values(*COMMENT.lookups, "post_type_id"):
+        payloads[(post_type_registry.name_for(row["post_type_id"]), row["post_id"])].append(COMMENT.build(row))
+    return payloads
+
+
+def post_comments(post_type, post_ids):
+    return Comment.objects.filter(post_type_id=post_type_registry.id_for(post_type), post_id__in=post_ids)
+
+
+@timed_serialization
+def comment_payloads(post_type, post_id):
+    return comment_payloads_by_post(post_comments(post_type, [post_id]))[(post_type, int(post_id))]
+
+
+def answer_payloads_by_question(answers, comments_by_post):
+    payloads = defaultdict(list)
+    for row in answers.order_by("id").values(*ANSWER.lookups):
+        comments = comments_by_post.get((PostType.ANS, row["id"]), [])
+        payloads[row["question_id"]].append(ANSWER.build(row, comments=comments))
+    return payloads
+
+
+@timed_serialization
+def answer_payloads(question_id):
+    answers = Answer.objects.filter(question_id=question_id)
+    comments_by_post = comment_payloads_by_post(post_comments(PostType.ANS, answers.values("id")))
+    return answer_payloads_by_question(answers, comments_by_post)[int(question_id)]
+
+
+@timed_serialization
+def question_payloads(rows):
+    # Payloads of the question_values() rows, with their tags, answers and comments loaded in three queries
+    question_ids = [row["id"] for row in rows]
+    if not question_ids:
+        return []
+    tags_by_question = defaultdict(list)
+    for row in Tag.objects.filter(question__in=question_ids).order_by("id").values(*TAG.lookups, "question"):
+        tags_by_question[row["question"]].append(TAG.build(row))
+    answers = Answer.objects.filter(question_id__in=question_ids)
+    comments_by_post = comment_payloads_by_post(Comment.objects.filter(
+        Q(post_type_id=post_type_registry.id_for(PostType.QUES), post_id__in=question_ids)
+        | Q(post_type_id=post_type_registry.id_for(PostType.ANS), post_id__in=answers.values("id"))
+    ))
+    answers_by_question = answer_payloads_by_question(answers, comments_by_post)
+    return [
+        QUESTION.build(row, tags=tags_by_question[row["id"]], answers=answers_by_question[row["id"]],
+                       comments=comments_by_post.get((PostType.QUES, row["id"]), []))
+        for row in rows
+    ]
@@ -0,0 +1,198 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from stack_underflow_app.models import PostType, Tag
+
+logger = logging.getLogger(__name__)
+
+
+class PostTypeRegistry:
+    # The PostType table holds one row per post type and never changes at runtime,
+    # so its ids are served from memory instead of querying them on every request
+
+    def __init__(self):
+        self._ids = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        rows = list(PostType.objects.values_list("id", "name"))
+        with self._lock:
+            self._ids = {name: post_type_id for post_type_id, name in rows}
+            self._names = {post_type_id: name for post_type_id, name in rows}
+        logger.info(msg=f"Loaded {len(rows)} post types")
+
+    def id_for(self, name):
+        if name not in self._ids:
+            # Post types may have been created after the registry was loaded (eg. from the admin)
+            self.load()
+        try:
+            return self._ids[name]
+        except KeyError:
+            raise PostType.DoesNotExist(f"PostType {name} does not exist")
+
+    def name_for(self, post_type_id):
+        if post_type_id not in self._names:
+            self.load()
+        return self._names.get(post_type_id)
+
+
+class TagRegistry:
+    # Bounded LRU of tag name -> tag id. Entries are dropped locally when a Tag is saved or deleted,
+    # and a generation number kept in the shared cache tells the other workers to drop theirs.
+    # The generation is only as shared as the configured CACHES backend.
+
+    GENERATION_KEY = "tag_registry_generation"
+
+    def __init__(self, max_size, sync_interval):
+        self._ids = OrderedDict()
+        self._max_size = max_size
+        self._sync_interval = sync_interval
+        self._generation = None
+        self._synced_at = 0
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._synced_at < self._sync_interval:
+            return
+        self._synced_at = now
+        generation = cache.get(self.GENERATION_KEY)
+        with self._lock:
+            if generation != self._generation:
+                self._ids.clear()
+                self._generation = generation
+
+    def _lookup(self, names):
+        self._sync()
+        found = {}
+        with self._lock:
+            for name in names:
+                if name in self._ids:
+                    self._ids.move_to_end(name)
+                    found[name] = self._ids[name]
+        missing = [name for name in names if name not in found]
+        if missing:
+            found.update(Tag.objects.filter(name__in=missing).values_list("name", "id"))
+            self._remember(found)
+        return found
+
+    def _remember(self, ids):
+        with self._lock:
+            self._ids.update(ids)
+            while len(self._ids) > self._max_size:
+                self._ids.popitem(last=False)
+
+    def find_ids(self, names):
+        # Ids of the tags that exist among the given names
+        return self._lookup(names)
+
+    def ids_for(self, names):
+        found = self._lookup(names)
+        for name in names:
+            if name not in found:
+                raise Tag.DoesNotExist(f"Tag {name} does not exist")
+        return [found[name] for name in names]
+
+    def get_or_create_ids(self, names):
+        found = self._lookup(names)
+        for name in names:
+            if name not in found:
+                tag, _ = Tag.objects.get_or_create(name=name)
+                found[name] = tag.id
+        self._remember(found)
+        return [found[name] for name in names]
+
+    def invalidate(self, tag):
+        with self._lock:
+            for name in [name for name, tag_id in self._ids.items() if tag_id == tag.id or name == tag.name]:
+                del self._ids[name]
+        try:
+            generation = cache.incr(self.GENERATION_KEY)
+        except ValueError:
+            generation = 1
+            cache.set(self.GENERATION_KEY, generation, timeout=None)
+        self._generation = generation
+
+
+class TagPrefixIndex:
+    # Tags sorted by lowercased name, so the tags starting with a prefix are one bisect away.
+    # Kept up to date from the Tag and Question.tags signals of this process, and reloaded every
+    # refresh_interval seconds to pick up changes made by other workers.
+
+    MAX_KEY = "\U0010ffff"
+
+    def __init__(self, refresh_interval):
+        self._entries = []
+        self._tags = {}
+        self._refresh_interval = refresh_interval
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        # Held while loading, so that a single caller reloads the index
+        self._load_lock = threading.Lock()
+
+    def _stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self._refresh_interval
+
+    def load(self):
+        rows = Tag.objects.values_list("id", "name", "question_count")
+        tags = {tag_id: [name, question_count] for tag_id, name, question_count in rows}
+        entries = sorted((name.lower(), tag_id) for tag_id, (name, _) in tags.items())
+        with self._lock:
+            self._tags = tags
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+
+    def suggest(self, prefix, limit):
+        if self._loaded_at is None:
+            # Nothing to serve yet, the callers wait for the first load
+            with self._load_lock:
+                if self._loaded_at is None:
+                    self.load()
+        elif self._stale() and self._load_lock.acquire(blocking=False):
+            # The others keep serving the stale index meanwhile
+            try:
+                if self._stale():
+                    self.load()
+            finally:
+                self._load_lock.release()
+        prefix = prefix.lower()
+        with self._lock:
+            start = bisect_left(self._entries, (prefix,))
+            end = bisect_left(self._entries, (prefix + self.MAX_KEY,))
+            tag_ids = [tag_id for _, tag_id in self._entries[start:end]]
+            top = heapq.nsmallest(limit, tag_ids, key=lambda tag_id: (-self._tags[tag_id][1], self._tags[tag_id][0]))
+            return [{"id": tag_id, "name": self._tags[tag_id][0], "question_count": self._tags[tag_id][1]}
+                    for tag_id in top]
+
+    def _remove(self, tag_id):
+        tag = self._tags.pop(tag_id, None)
+        if tag is not None:
+            self._entries.pop(bisect_left(self._entries, (tag[0].lower(), tag_id)))
+
+    def put(self, tag_id, name, question_count):
+        with self._lock:
+            self._remove(tag_id)
+            self._tags[tag_id] = [name, question_count]
+            insort(self._entries, (name.lower(), tag_id))
+
+    def remove(self, tag_id):
+        with self._lock:
+            self._remove(tag_id)
+
+    def adjust_counts(self, tag_ids, delta):
+        with self._lock:
+            for tag_id in tag_ids:
+                if tag_id in self._tags:
+                    self._tags[tag_id][1] += delta
+
+
+post_type_registry = PostTypeRegistry()
+tag_registry = TagRegistry(max_size=settings.TAG_REGISTRY_SIZE, sync_interval=settings.TAG_REGISTRY_SYNC_INTERVAL)
+tag_prefix_index = TagPrefixIndex(refresh_interval=settings.TAG_SUGGEST_REFRESH_INTERVAL)
@@ -0,0 +1,96 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from stack_underflow_app.authentication import user_cache
+from stack_underflow_app.bulk import bulk_increment
+from stack_underflow_app.models import (POST_TYPE_MODELS, ReputationDaily,
+                                        ReputationEvent, User)
+from stack_underflow_app.registry import post_type_registry
+
+logger = logging.getLogger(__name__)
+
+REPUTATION_PER_VOTE = 10
+
+
+def vote_events(post_type_id, post_id, was_upvote, is_upvote):
+    # Reputation events for a vote on a post changing from `was_upvote` to `is_upvote`,
+    # each of them True (upvote), False (downvote) or None (no vote).
+    # The author of the post is resolved along with their reputation in one query.
+    post_model = POST_TYPE_MODELS[post_type_registry.name_for(post_type_id)]
+    author = post_model.objects.filter(id=post_id).values_list("author_id", "author__reputation_points").first()
+    if author is None or author[0] is None:
+        return []
+    return author_vote_events(*author, post_type_id, post_id, was_upvote, is_upvote)
+
+
+def author_vote_events(author_id, reputation_points, post_type_id, post_id, was_upvote, is_upvote):
+    # vote_events for a post whose author and their reputation are already known
+    changes = []
+    if was_upvote is not None:
+        changes.append((-REPUTATION_PER_VOTE, ReputationEvent.UPVOTE_REMOVED) if was_upvote
+                       else (REPUTATION_PER_VOTE, ReputationEvent.DOWNVOTE_REMOVED))
+    if is_upvote:
+        changes.append((REPUTATION_PER_VOTE, ReputationEvent.UPVOTE))
+    elif is_upvote is not None:
+        # Downvotes never take an author's reputation below zero. The reputation read here does not
+        # include the events not aggregated yet, so the floor is only as fresh as the aggregation.
+        if reputation_points + sum(delta for delta, _ in changes) <= 0:
+            logger.error(msg="Cannot deduct rep. points since User does not have enough rep. points")
+        else:
+            changes.append((-REPUTATION_PER_VOTE, ReputationEvent.DOWNVOTE))
+    return [ReputationEvent(user_id=author_id, delta=delta, cause=cause, post_type_id=post_type_id, post_id=post_id)
+            for delta, cause in changes]
+
+
+def record_events(events):
+    # Inserts only, so that concurrent votes never contend on the author row
+    if events:
+        ReputationEvent.objects.bulk_create(events)
+    return len(events)
+
+
+def aggregate(batch_size=None):
+    # Folds the next batch of ledger events into User.reputation_points and ReputationDaily.
+    # Events are marked as aggregated in the transaction folding them in, rather than behind a cursor:
+    # ids are handed out before commit, so an event may become visible after one with a higher id, and
+    # it is still unmarked then. Events locked by a concurrent run are skipped, that run folds them in.
+    batch_size = batch_size or settings.REPUTATION_AGGREGATION_BATCH_SIZE
+    with transaction.atomic():
+        rows = list(
+            ReputationEvent.objects.select_for_update(skip_locked=True).filter(aggregated=False)
+            .order_by("id")
+            .values_list("id", "user_id", "delta", "created_at")[:batch_size]
+        )
+        if not rows:
+            return 0
+        by_user = defaultdict(int)
+        by_day = defaultdict(int)
+        for _, user_id, delta, created_at in rows:
+            by_user[user_id] += delta
+            by_day[(user_id, created_at.date())] += delta
+        ReputationEvent.objects.filter(id__in=[row[0] for row in rows]).update(aggregated=True)
+        bulk_increment(User, "reputation_points", by_user)
+        ReputationDaily.objects.bulk_create([ReputationDaily(user_id=user_id, day=day) for user_id, day in by_day],
+                                            ignore_conflicts=True)
+        rollups = ReputationDaily.objects.filter(user_id__in=by_user, day__in={day for _, day in by_day})
+        bulk_increment(ReputationDaily, "delta", {
+            rollup_id: by_day[(user_id, day)]
+            for rollup_id, user_id, day in rollups.values_list("id", "user_id", "day")
+            if (user_id, day) in by_day
+        })
+        # bulk_increment sends no post_save, the workers' cached users are dropped through the shared cache
+        transaction.on_commit(user_cache.invalidate_all)
+    logger.info(msg=f"Aggregated {len(rows)} reputation events of {len(by_user)} users")
+    return len(rows)
+
+
+def reputation_history(user_id, days):
+    # Daily reputation changes over the last `days` days, read from the rollups
+    since = timezone.now().date() - timedelta(days=days - 1)
+    history = list(ReputationDaily.objects.filter(user_id=user_id, day__gte=since).order_by("day")
+                   .values("day", "delta"))
+    return history, sum(day["delta"] for day in history)
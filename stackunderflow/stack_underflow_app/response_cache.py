@@ -0,0 +1,145 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from stack_underflow_app.metrics import cache_lookup
+
+
+class LocalMemoryBackend:
+    # Per-process LRU, invalidations only reach the process they happen in.
+    # Use it with a single worker process, or with SharedBackend otherwise.
+
+    def __init__(self, max_entries=10000, timeout=300):
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._timeout = timeout
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self._timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, default):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] >= time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[0]
+        value = default()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] >= time.monotonic():
+                return entry[0]
+        self.set(key, value)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SharedBackend:
+    # Stores entries in one of the Django CACHES (eg. Redis or Memcached) so that every worker
+    # sees the same entries and invalidations. LocMemCache stands in for it locally.
+
+    def __init__(self, alias="default", timeout=300):
+        self._cache = caches[alias]
+        self._timeout = timeout
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value, timeout=self._timeout)
+
+    def get_or_set(self, key, default):
+        return self._cache.get_or_set(key, default, timeout=self._timeout)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+
+class QuestionCache:
+    # Fully serialized question payloads, keyed by question id.
+    # Every question has a random version token that is replaced whenever the question or anything
+    # nested in it changes. Entries are stored along with the version they were built from, so an
+    # entry built concurrently with an invalidation is never served. The questions list has a
+    # version of its own which changes along with any question.
+
+    def __init__(self, backend):
+        self._backend = backend
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    LIST_VERSION_KEY = "questions:version"
+
+    @staticmethod
+    def _key(question_id):
+        return f"question:{question_id}"
+
+    @staticmethod
+    def _version_key(question_id):
+        return f"question:{question_id}:version"
+
+    @staticmethod
+    def _new_version():
+        return uuid.uuid4().hex
+
+    def version(self, question_id):
+        return self._backend.get_or_set(self._version_key(question_id), self._new_version)
+
+    def list_version(self):
+        return self._backend.get_or_set(self.LIST_VERSION_KEY, self._new_version)
+
+    def get(self, question_id, version):
+        entry = self._backend.get(self._key(question_id))
+        if entry is not None and entry["version"] != version:
+            entry = None
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        cache_lookup("question", entry is not None)
+        return entry
+
+    def set(self, question_id, entry):
+        self._backend.set(self._key(question_id), entry)
+
+    def invalidate(self, question_id):
+        self._backend.delete(self._version_key(question_id))
+        self._backend.delete(self._key(question_id))
+        self._backend.delete(self.LIST_VERSION_KEY)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+
+question_cache = QuestionCache(import_string(settings.QUESTION_CACHE_BACKEND)(**settings.QUESTION_CACHE_OPTIONS))
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import random
+import time
+
+from asgiref.local import Local
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.settings import api_settings
+from stack_underflow_app.authentication import CachedJWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+PIN_KEY = "primary-pin:{}"
+
+_requests = Local()
+# Replica alias -> time.monotonic() until which it is left out after failing to connect
+_down_until = {}
+
+
+class RequestRouting:
+    # Database routing state of the request being served. Reads of safe requests go to the replica picked
+    # on the first read, unless the user wrote recently or the request itself wrote something.
+
+    def __init__(self, request):
+        self.request = request
+        self.read_only = request.method in SAFE_METHODS
+        self.alias = None
+        self.wrote = False
+        self.primary = False
+
+    def read_alias(self):
+        if not self.read_only or self.wrote or self.primary:
+            return DEFAULT_DB_ALIAS
+        if self.alias is None:
+            self.alias = DEFAULT_DB_ALIAS if is_pinned(request_user_id(self.request)) else pick_replica()
+        return self.alias
+
+
+def request_user_id(request):
+    # The id in the request's access token, without loading the user
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    try:
+        raw_token = authentication.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except AuthenticationFailed:
+        # Reported by the view, which authenticates the request again
+        return None
+
+
+def read_from_primary():
+    # Sends the remaining reads of the current request to the primary, for results that outlive the request.
+    # A question cache entry built from a lagging replica would be served to everyone, the writer included,
+    # under a fresh version for as long as it is cached.
+    routing = getattr(_requests, "routing", None)
+    if routing is not None:
+        routing.primary = True
+
+
+def pin_to_primary(user_id):
+    cache.set(PIN_KEY.format(user_id), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(PIN_KEY.format(user_id), False)
+
+
+def pick_replica():
+    # Weighted pick among the replicas that are up, falling back to the primary when none can be reached
+    replicas = dict(settings.REPLICA_WEIGHTS)
+    while replicas:
+        now = time.monotonic()
+        replicas = {alias: weight for alias, weight in replicas.items() if _down_until.get(alias, 0) <= now}
+        if not replicas:
+            break
+        alias = random.choices(list(replicas), weights=list(replicas.values()))[0]
+        try:
+            connections[alias].ensure_connection()
+        except OperationalError:
+            logger.warning(msg=f"Replica {alias} is unreachable, leaving it out for {settings.REPLICA_RETRY_SECONDS}s",
+                           exc_info=True)
+            _down_until[alias] = now + settings.REPLICA_RETRY_SECONDS
+            del replicas[alias]
+            continue
+        return alias
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    # Sends the reads of safe requests to the read replicas and everything else to the primary.
+    # Reads outside of requests (management commands, background threads) stay on the primary.
+
+    def db_for_read(self, model, **hints):
+        routing = getattr(_requests, "routing", None)
+        return DEFAULT_DB_ALIAS if routing is None else routing.read_alias()
+
+    def db_for_write(self, model, **hints):
+        routing = getattr(_requests, "routing", None)
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def pin_writer(request, routing, response):
+    if (routing.wrote or not routing.read_only) and response.status_code < 400:
+        user_id = request_user_id(request)
+        if user_id is not None:
+            pin_to_primary(user_id)
+
+
+class ReplicaRoutingMiddleware:
+    # Tracks the routing state of each request, and keeps the reads of users who just wrote something on the
+    # primary for REPLICA_PIN_SECONDS, so that they see their own writes while the replicas catch up.
+    # Left out of the middleware chain when there are no replicas, and async under ASGI.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_WEIGHTS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Lets Django await this middleware, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        routing = _requests.routing = RequestRouting(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            del _requests.routing
+        pin_writer(request, routing, response)
+        return response
+
+    async def __acall__(self, request):
+        routing = _requests.routing = RequestRouting(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            del _requests.routing
+        if routing.wrote or not routing.read_only:
+            await sync_to_async(pin_writer, thread_sensitive=False)(request, routing, response)
+        return response
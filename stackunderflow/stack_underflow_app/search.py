@@ -0,0 +1,73 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum, Value
+from stack_underflow_app.models import Answer, Question, QuestionSearchTerm
+
+# Relative weight of matches in the title, the description and the answers
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 2
+ANSWER_WEIGHT = 1
+
+TERM_PATTERN = re.compile(r"\w+")
+
+
+def uses_search_vector():
+    return connection.vendor == "postgresql"
+
+
+def tokenize(text):
+    max_length = QuestionSearchTerm._meta.get_field("term").max_length
+    return [term[:max_length] for term in TERM_PATTERN.findall((text or "").lower()) if len(term) > 1]
+
+
+# Updates the search document of one question from its title, description and answers
+def index_question(question_id):
+    question = Question.objects.filter(id=question_id).values("title", "description").first()
+    if question is None:
+        return
+    answers = " ".join(Answer.objects.filter(question_id=question_id).values_list("answer_body", flat=True))
+    if uses_search_vector():
+        config = settings.SEARCH_CONFIG
+        Question.objects.filter(id=question_id).update(
+            search_vector=SearchVector("title", weight="A", config=config)
+            + SearchVector("description", weight="B", config=config)
+            + SearchVector(Value(answers), weight="C", config=config)
+        )
+        return
+    weights = Counter()
+    for text, weight in ((question["title"], TITLE_WEIGHT),
+                         (question["description"], DESCRIPTION_WEIGHT),
+                         (answers, ANSWER_WEIGHT)):
+        for term in tokenize(text):
+            weights[term] += weight
+    with transaction.atomic():
+        QuestionSearchTerm.objects.filter(question_id=question_id).delete()
+        QuestionSearchTerm.objects.bulk_create(
+            QuestionSearchTerm(term=term, question_id=question_id, weight=weight) for term, weight in weights.items()
+        )
+
+
+# Narrows down the given questions to the ones matching every term of the query, most relevant first
+def search_questions(queryset, query):
+    if uses_search_vector():
+        search_query = SearchQuery(query, config=settings.SEARCH_CONFIG, search_type="websearch")
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-id")
+        )
+    terms = set(tokenize(query))
+    if not terms:
+        return queryset.none()
+    # Annotating after filtering on the same relation only aggregates the matched terms
+    return (
+        queryset.filter(questionsearchterm__term__in=terms)
+        .annotate(matched=Count("questionsearchterm"), rank=Sum("questionsearchterm__weight"))
+        .filter(matched=len(terms))
+        .order_by("-rank", "-id")
+    )
@@ -1,52 +1,173 @@
 import logging
 
-from django.db.models.signals import post_delete, post_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
 from django.dispatch import receiver
-from stack_underflow_app.models import Answer, PostType, Question, Votes
+from django.utils import timezone
+from stack_underflow_app.authentication import user_cache
+from stack_underflow_app.metrics import POSTS_CREATED
+from stack_underflow_app.models import (Answer, Comment, PostType, Question,
+                                        Tag, User, Votes)
+from stack_underflow_app.queries import question_id_for_post
+from stack_underflow_app.registry import tag_prefix_index, tag_registry
+from stack_underflow_app.response_cache import question_cache
+from stack_underflow_app.search import index_question
+from stack_underflow_app.votes import apply_vote_change
 
 logger = logging.getLogger(__name__)
 
 
-def __get_post_object(post_type, post_id):
-    post_object = None
-    if post_type.name == PostType.QUES:
-        post_object = Question.objects.get(id=post_id)
-    elif post_type.name == PostType.ANS:
-        post_object = Answer.objects.get(id=post_id)
-    return post_object
+def __update_tag_counts(tag_ids, delta):
+    if not tag_ids or not delta:
+        return
+    Tag.objects.filter(id__in=tag_ids).update(question_count=F("question_count") + delta)
+    transaction.on_commit(lambda: tag_prefix_index.adjust_counts(tag_ids, delta))
 
 
+def __invalidate_question(question_id):
+    # Invalidate once the change is committed, otherwise a concurrent read could
+    # cache the pre-commit state again right after the invalidation
+    if question_id is not None:
+        transaction.on_commit(lambda: question_cache.invalidate(question_id))
+
+
+# Drop cached users once their change is committed, so that requests authenticate with the new state
+@receiver(signal=[post_save, post_delete], sender=User)
+def user_cache_handler(sender, **kwargs):
+    user_id = kwargs["instance"].pk
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
+
+# The vote endpoints go through votes.toggle_vote, which applies these itself.
+# Votes saved or deleted through the ORM (cascades, admin, shell) are handled here.
 @receiver(signal=[post_save], sender=Votes)
 def votes_post_save_handler(sender, **kwargs):
     instance = kwargs["instance"]
-    post_object = __get_post_object(instance.post_type, instance.post_id)
-    author = post_object.author
-    old_rep_points = author.reputation_points
-    if instance.upvote:
-        author.reputation_points = old_rep_points + 10
-        author.save(update_fields=["reputation_points"])
-        logger.info(msg=f"Rep. points incremented by 10 successfully for author {author}")
-    elif instance.downvote:
-        if old_rep_points == 0:
-            logger.error(msg="Cannot deduct rep. points since User does not have enough rep. points")
-            return
-        author.reputation_points = old_rep_points - 10
-        author.save(update_fields=["reputation_points"])
-        logger.info(msg=f"Rep. points decremented by 10 successfully for author {author}")
+    # An existing vote is only ever saved when it is flipped
+    was_upvote = None if kwargs["created"] else not instance.upvote
+    apply_vote_change(instance.post_type_id, instance.post_id, was_upvote, instance.upvote)
 
 
 @receiver(signal=[post_delete], sender=Votes)
 def votes_post_delete_handler(sender, **kwargs):
     instance = kwargs["instance"]
-    post_object = __get_post_object(instance.post_type, instance.post_id)
-    author = post_object.author
-    old_rep_points = author.reputation_points
-    # Restore rep points
-    if instance.upvote:
-        author.reputation_points = old_rep_points - 10
-        author.save(update_fields=["reputation_points"])
-        logger.info(msg=f"Rep. points decremented by 10 successfully for author {author}")
-    elif instance.downvote:
-        author.reputation_points = old_rep_points + 10
-        author.save(update_fields=["reputation_points"])
-        logger.info(msg=f"Rep. points incremented by 10 successfully for author {author}")
+    apply_vote_change(instance.post_type_id, instance.post_id, instance.upvote, None)
+
+
+@receiver(signal=[post_save, post_delete], sender=Tag)
+def tag_changed_handler(sender, **kwargs):
+    tag = kwargs["instance"]
+    tag_registry.invalidate(tag)
+    if kwargs["signal"] is post_delete:
+        transaction.on_commit(lambda: tag_prefix_index.remove(tag.id))
+    else:
+        transaction.on_commit(lambda: tag_prefix_index.put(tag.id, tag.name, tag.question_count))
+
+
+@receiver(signal=[post_save, post_delete], sender=Question)
+def question_changed_handler(sender, **kwargs):
+    __invalidate_question(kwargs["instance"].id)
+
+
+@receiver(signal=[m2m_changed], sender=Question.tags.through)
+def question_tags_count_handler(sender, **kwargs):
+    action = kwargs["action"]
+    if action == "pre_clear":
+        # pk_set is not provided on clear, so the tags being cleared are counted before they go
+        if kwargs["reverse"]:
+            tag_ids, delta = [kwargs["instance"].id], -kwargs["instance"].question_set.count()
+        else:
+            tag_ids, delta = list(kwargs["instance"].tags.values_list("id", flat=True)), -1
+    elif action == "post_add" and kwargs["pk_set"]:
+        # pk_set only has the links actually added
+        if kwargs["reverse"]:
+            tag_ids, delta = [kwargs["instance"].id], len(kwargs["pk_set"])
+        else:
+            tag_ids, delta = list(kwargs["pk_set"]), 1
+    elif action == "pre_remove" and kwargs["pk_set"]:
+        # pk_set has the ids asked to be removed, linked or not, so the links are counted before they go
+        # (in the same transaction as their removal)
+        if kwargs["reverse"]:
+            links = sender.objects.filter(tag_id=kwargs["instance"].id, question_id__in=kwargs["pk_set"])
+            tag_ids, delta = [kwargs["instance"].id], -links.count()
+        else:
+            links = sender.objects.filter(question_id=kwargs["instance"].id, tag_id__in=kwargs["pk_set"])
+            tag_ids, delta = list(links.values_list("tag_id", flat=True)), -1
+    else:
+        return
+    __update_tag_counts(tag_ids, delta)
+
+
+@receiver(signal=[pre_delete], sender=Question)
+def question_delete_tags_count_handler(sender, **kwargs):
+    # Deleting a question removes its tags through rows without an m2m_changed signal
+    __update_tag_counts(list(Tag.objects.filter(question=kwargs["instance"]).values_list("id", flat=True)), -1)
+
+
+@receiver(signal=[m2m_changed], sender=Question.tags.through)
+def question_tags_changed_handler(sender, **kwargs):
+    if kwargs["action"] not in ("post_add", "post_remove", "post_clear"):
+        return
+    if kwargs["reverse"]:
+        for question_id in kwargs["pk_set"] or []:
+            __invalidate_question(question_id)
+    else:
+        __invalidate_question(kwargs["instance"].id)
+
+
+@receiver(signal=[post_save, post_delete], sender=Answer)
+def answer_changed_handler(sender, **kwargs):
+    __invalidate_question(kwargs["instance"].question_id)
+
+
+@receiver(signal=[post_save, post_delete], sender=Answer)
+def answer_activity_handler(sender, **kwargs):
+    if kwargs.get("created") is False:
+        return
+    Question.objects.filter(id=kwargs["instance"].question_id).update(last_activity_at=timezone.now())
+
+
+@receiver(signal=[post_save, post_delete], sender=Comment)
+def post_activity_handler(sender, **kwargs):
+    instance = kwargs["instance"]
+    __invalidate_question(question_id_for_post(instance.post_type_id, instance.post_id))
+
+
+@receiver(signal=[post_save, pre_delete], sender=Tag)
+def tag_renamed_or_deleted_handler(sender, **kwargs):
+    # Tag names are part of the cached payload of every question carrying the tag
+    if kwargs.get("created"):
+        return
+    for question_id in Question.objects.filter(tags=kwargs["instance"]).values_list("id", flat=True):
+        __invalidate_question(question_id)
+
+
+@receiver(signal=[post_save], sender=Question)
+def question_search_handler(sender, **kwargs):
+    update_fields = kwargs["update_fields"]
+    if update_fields and not {"title", "description"} & set(update_fields):
+        return
+    question_id = kwargs["instance"].id
+    transaction.on_commit(lambda: index_question(question_id))
+
+
+@receiver(signal=[post_save, post_delete], sender=Answer)
+def answer_search_handler(sender, **kwargs):
+    # Indexed on commit, by then a question deleted along with its answers is gone and is skipped
+    update_fields = kwargs.get("update_fields")
+    if update_fields and "answer_body" not in update_fields:
+        return
+    question_id = kwargs["instance"].question_id
+    transaction.on_commit(lambda: index_question(question_id))
+
+
+@receiver(signal=[post_save], sender=Question)
+@receiver(signal=[post_save], sender=Answer)
+@receiver(signal=[post_save], sender=Comment)
+def post_created_metrics_handler(sender, **kwargs):
+    if not kwargs["created"]:
+        return
+    post_type = {Question: PostType.QUES, Answer: PostType.ANS, Comment: PostType.COMT}[sender]
+    transaction.on_commit(lambda: POSTS_CREATED.labels(post_type).inc())
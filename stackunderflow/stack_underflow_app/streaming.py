@@ -0,0 +1,81 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connections
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from stack_underflow_app.bulk import chunks
+
+
+class StreamingJSONRenderer(JSONRenderer):
+    # JSONRenderer that can also write a list as it is produced, one batch of items at a time
+
+    def stream(self, batches):
+        # One JSON array, in chunks of one batch each
+        separator = b"["
+        for batch in batches:
+            if batch:
+                yield separator + self.render(batch)[1:-1]
+                separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+
+
+class NDJSONRenderer(StreamingJSONRenderer):
+    # Newline delimited JSON, one item per line
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return super().render(data, accepted_media_type, renderer_context) + b"\n"
+
+    def stream(self, batches):
+        for batch in batches:
+            yield b"".join(self.render(item) for item in batch)
+
+
+def queryset_batches(queryset, batch_size):
+    # Rows in lists of batch_size, read through a server-side cursor on PostgreSQL. QuerySet.iterator()
+    # ignores prefetch_related, so the queryset's prefetches are run on each batch instead.
+    lookups = queryset._prefetch_related_lookups
+    rows = queryset.prefetch_related(None).iterator(chunk_size=batch_size)
+    for batch in chunks(rows, batch_size):
+        prefetch_related_objects(batch, *lookups)
+        yield batch
+
+
+def streaming_response(request, batches):
+    # Streams the batches of serialized items with the renderer negotiated for the request
+    renderer = request.accepted_renderer
+    return StreamingHttpResponse(renderer.stream(batches), content_type=renderer.media_type)
+
+
+class StreamingASGIHandler(ASGIHandler):
+    # Django iterates streaming responses on the event loop, where database queries are not allowed.
+    # This handler pulls the parts in a thread of their own instead, which keeps the response's database
+    # connection to itself, and sends them before the closing message of the (then empty) response.
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        parts = iter(response)
+        response.streaming_content = ()
+
+        async def send_parts(message):
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                loop = asyncio.get_event_loop()
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    try:
+                        part = await loop.run_in_executor(executor, next, parts, None)
+                        while part is not None:
+                            for chunk, _ in self.chunk_bytes(part):
+                                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                            part = await loop.run_in_executor(executor, next, parts, None)
+                    finally:
+                        await loop.run_in_executor(executor, connections.close_all)
+            await send(message)
+
+        await super().send_response(response, send_parts)
@@ -1,13 +1,22 @@
+from django.conf import settings
+from django.urls import re_path
 from rest_framework_nested import routers
 from stack_underflow_app.apis.answer_apis import AnswerViewSet
+from stack_underflow_app.apis.async_apis import ASYNC_READ_VIEWS, read_endpoint
 from stack_underflow_app.apis.comment_apis import (AnswerCommentViewSet,
                                                    QuestionCommentViewSet)
 from stack_underflow_app.apis.question_apis import QuestionViewSet
+from stack_underflow_app.apis.stats_apis import StatsViewSet
 from stack_underflow_app.apis.tag_apis import TagViewSet
+from stack_underflow_app.apis.user_apis import ReputationViewSet
+from stack_underflow_app.apis.vote_apis import VoteViewSet
 
 router = routers.DefaultRouter()
 router.register("questions", QuestionViewSet, basename="questions")
 router.register("tags", TagViewSet, basename="tags")
+router.register("reputation", ReputationViewSet, basename="reputation")
+router.register("votes", VoteViewSet, basename="votes")
+router.register("stats", StatsViewSet, basename="stats")
 
 # For Question's comments
 ques_comments_router = routers.NestedDefaultRouter(router, "questions", lookup="question")
@@ -20,3 +29,12 @@ ans_comments_router = routers.NestedDefaultRouter(ques_ans_router, "answers", lo
 ans_comments_router.register("comments", AnswerCommentViewSet, basename="ans_comments")
 
 urlpatterns = router.urls + ques_comments_router.urls + ques_ans_router.urls + ans_comments_router.urls
+
+if settings.ASYNC_READ_ENDPOINTS:
+    # Async read views go first, taking over GET and HEAD on the URLs of the routes they stand in for
+    urlpatterns = [
+        re_path(pattern.pattern.regex.pattern, read_endpoint(ASYNC_READ_VIEWS[pattern.name], pattern.callback),
+                name=pattern.name)
+        for pattern in urlpatterns
+        if pattern.name in ASYNC_READ_VIEWS and "format" not in pattern.pattern.regex.groupindex
+    ] + urlpatterns
@@ -0,0 +1,107 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from stack_underflow_app.models import Question
+from stack_underflow_app.response_cache import question_cache
+
+logger = logging.getLogger(__name__)
+
+
+def viewer_key(request):
+    if request.user and request.user.is_authenticated:
+        return f"user:{request.user.id}"
+    return f"ip:{request.META.get('REMOTE_ADDR')}"
+
+
+class ViewCountBuffer:
+    # Question views are counted in memory and written behind in batches, so reading a question
+    # never takes a row lock on it. At most max_pending views (or flush_interval seconds worth of
+    # views) are lost if the process dies before a flush.
+
+    def __init__(self, flush_interval, max_pending, dedup_window):
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._dedup_window = dedup_window
+        self._pending = Counter()
+        self._pending_views = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def record(self, question_id, viewer=None):
+        now = time.monotonic()
+        with self._lock:
+            if viewer is not None and self._dedup_window:
+                seen_at = self._seen.get((question_id, viewer))
+                if seen_at is not None and now - seen_at < self._dedup_window:
+                    return False
+                self._seen[(question_id, viewer)] = now
+            self._pending[question_id] += 1
+            self._pending_views += 1
+            must_flush = self._pending_views >= self._max_pending or not self._flush_interval
+        if must_flush:
+            self.flush()
+        else:
+            self._start_flusher()
+        return True
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._pending_views = 0
+            now = time.monotonic()
+            self._seen = {key: seen_at for key, seen_at in self._seen.items()
+                          if now - seen_at < self._dedup_window}
+        if not pending:
+            return 0
+        try:
+            with transaction.atomic():
+                # Sorted so that concurrent flushes from several workers lock rows in the same order
+                for question_id in sorted(pending):
+                    Question.objects.filter(id=question_id).update(viewcount=F("viewcount") + pending[question_id],
+                                                                   last_activity_at=timezone.now())
+                # The cached details and lists show the view counts, update() sends no post_save to invalidate them
+                transaction.on_commit(lambda: self._invalidate(pending))
+        except DatabaseError:
+            logger.exception(msg="Could not flush view counts, keeping them for the next flush")
+            with self._lock:
+                self._pending.update(pending)
+                self._pending_views += sum(pending.values())
+            return 0
+        logger.info(msg=f"Flushed view counts of {len(pending)} questions")
+        return len(pending)
+
+    @staticmethod
+    def _invalidate(question_ids):
+        for question_id in question_ids:
+            question_cache.invalidate(question_id)
+
+    def _start_flusher(self):
+        # The flusher thread does not survive a fork, so each worker process starts its own
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._run_flusher, name="viewcount-flusher", daemon=True).start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self._flush_interval)
+            self.flush()
+            close_old_connections()
+
+
+view_counter = ViewCountBuffer(flush_interval=settings.VIEWCOUNT_FLUSH_INTERVAL,
+                               max_pending=settings.VIEWCOUNT_MAX_PENDING,
+                               dedup_window=settings.VIEWCOUNT_DEDUP_WINDOW)
+atexit.register(view_counter.flush)
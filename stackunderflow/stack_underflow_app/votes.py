@@ -0,0 +1,314 @@
+import logging
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils import timezone
+from stack_underflow_app.bulk import bulk_increment
+from stack_underflow_app.metrics import count_votes
+from stack_underflow_app.models import (POST_TYPE_MODELS, AggregationCursor,
+                                        PostType, Question, User, VoteLogEntry,
+                                        Votes)
+from stack_underflow_app.queries import (question_id_for_post,
+                                         question_ids_for_posts)
+from stack_underflow_app.registry import post_type_registry
+from stack_underflow_app.reputation import (author_vote_events, record_events,
+                                            vote_events)
+from stack_underflow_app.response_cache import question_cache
+
+logger = logging.getLogger(__name__)
+
+VOTE_LOG_CURSOR_NAME = "vote_log"
+
+# Removes the vote when it is repeated, otherwise inserts it or flips the existing one, in one statement.
+# The conditional DO UPDATE leaves a vote that a concurrent identical request has just cast alone,
+# and xmax = 0 tells a freshly inserted row apart from an updated one.
+TOGGLE_SQL = """
+WITH removed AS (
+    DELETE FROM {table}
+    WHERE post_id = %(post_id)s AND post_type_id = %(post_type_id)s AND user_id = %(user_id)s
+    AND upvote = %(upvote)s
+    RETURNING id
+), upserted AS (
+    INSERT INTO {table} (post_id, post_type_id, user_id, upvote, downvote)
+    SELECT %(post_id)s, %(post_type_id)s, %(user_id)s, %(upvote)s, NOT %(upvote)s
+    WHERE NOT EXISTS (SELECT 1 FROM removed)
+    ON CONFLICT (post_id, post_type_id, user_id) DO UPDATE
+    SET upvote = EXCLUDED.upvote, downvote = EXCLUDED.downvote
+    WHERE {table}.upvote <> EXCLUDED.upvote
+    RETURNING xmax = 0 AS inserted
+)
+SELECT EXISTS (SELECT 1 FROM removed), (SELECT inserted FROM upserted)
+"""
+
+
+def __toggle(post_type_id, post_id, user_id, upvote):
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(TOGGLE_SQL.format(table=connection.ops.quote_name(Votes._meta.db_table)),
+                           {"post_id": post_id, "post_type_id": post_type_id, "user_id": user_id, "upvote": upvote})
+            removed, inserted = cursor.fetchone()
+    else:
+        # Other databases get the same outcome with a locking read and a write. Signals are bypassed
+        # (bulk_create, update, plain DELETE) as the side effects are applied by toggle_vote itself.
+        votes = Votes.objects.filter(post_id=post_id, post_type_id=post_type_id, user_id=user_id)
+        current = votes.select_for_update().values_list("upvote", flat=True).first()
+        removed = current == upvote
+        inserted = None
+        if removed:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {connection.ops.quote_name(Votes._meta.db_table)} "
+                               "WHERE post_id = %s AND post_type_id = %s AND user_id = %s",
+                               [post_id, post_type_id, user_id])
+        elif current is None:
+            Votes.objects.bulk_create([Votes(post_id=post_id, post_type_id=post_type_id, user_id=user_id,
+                                             upvote=upvote, downvote=not upvote)])
+            inserted = True
+        else:
+            votes.update(upvote=upvote, downvote=not upvote)
+            inserted = False
+    if removed:
+        return upvote, None
+    if inserted is None:
+        # A concurrent identical request won the race, nothing changed
+        return upvote, upvote
+    return (None if inserted else not upvote), upvote
+
+
+def apply_vote_change(post_type_id, post_id, was_upvote, is_upvote):
+    # Updates the vote counters and the author's reputation after a vote on a post changed from
+    # `was_upvote` to `is_upvote`, each of them True (upvote), False (downvote) or None (no vote).
+    # Returns False when the post does not exist.
+    upvote_delta = (is_upvote is True) - (was_upvote is True)
+    downvote_delta = (is_upvote is False) - (was_upvote is False)
+    if not upvote_delta and not downvote_delta:
+        return True
+    post_model = POST_TYPE_MODELS[post_type_registry.name_for(post_type_id)]
+    activity = {"last_activity_at": timezone.now()} if post_model is Question else {}
+    # F() expressions make the increment atomic in the database,
+    # so concurrent votes on the same post never overwrite each other
+    updated = post_model.objects.filter(id=post_id).update(
+        upvote_count=F("upvote_count") + upvote_delta,
+        downvote_count=F("downvote_count") + downvote_delta,
+        score=F("score") + upvote_delta - downvote_delta,
+        **activity
+    )
+    if not updated:
+        return False
+    events = vote_events(post_type_id, post_id, was_upvote, is_upvote)
+    record_events(events)
+    logger.info(msg=f"Rep. points changed by {sum(event.delta for event in events)} for author of post {post_id}")
+    question_id = question_id_for_post(post_type_id, post_id)
+    if question_id is not None:
+        transaction.on_commit(lambda: question_cache.invalidate(question_id))
+    return True
+
+
+def __load_authors(post_ids):
+    # Authors of the given posts ({post type name: post ids}) and their reputation,
+    # keyed by (post type id, post id), with one query per post type
+    authors = {}
+    for post_type_name, ids in post_ids.items():
+        post_type_id = post_type_registry.id_for(post_type_name)
+        posts = POST_TYPE_MODELS[post_type_name].objects.filter(id__in=ids)
+        for post_id, author_id, reputation_points in posts.values_list("id", "author_id",
+                                                                       "author__reputation_points"):
+            authors[(post_type_id, post_id)] = (author_id, reputation_points)
+    return authors
+
+
+def __posts_filter(post_ids):
+    posts_filter = Q()
+    for post_type_name, ids in post_ids.items():
+        posts_filter |= Q(post_type_id=post_type_registry.id_for(post_type_name), post_id__in=ids)
+    return posts_filter
+
+
+def __load_votes(post_ids, user_ids):
+    # The votes of the given users on the given posts, locked, keyed by (user id, post type id, post id)
+    votes = Votes.objects.select_for_update().filter(__posts_filter(post_ids), user_id__in=user_ids)
+    return {(user_id, post_type_id, post_id): (vote_id, upvote)
+            for vote_id, user_id, post_type_id, post_id, upvote
+            in votes.values_list("id", "user_id", "post_type_id", "post_id", "upvote")}
+
+
+def __load_logged_votes(post_ids, user_id):
+    # Write-behind mode: the user's votes on the given posts as __log_vote resolves them, their latest logged
+    # vote or their applied vote when none is pending, keyed by (user id, post type id, post id)
+    posts_filter = __posts_filter(post_ids)
+    list(User.objects.select_for_update().filter(id=user_id).values_list("id"))
+    votes = {(user_id, post_type_id, post_id): upvote for post_type_id, post_id, upvote
+             in Votes.objects.filter(posts_filter, user_id=user_id).values_list("post_type_id", "post_id", "upvote")}
+    logged = VoteLogEntry.objects.filter(posts_filter, user_id=user_id).order_by("id")
+    for post_type_id, post_id, upvote in logged.values_list("post_type_id", "post_id", "upvote"):
+        votes[(user_id, post_type_id, post_id)] = upvote
+    return votes
+
+
+def __write_vote_changes(changes, votes, authors):
+    # Writes net vote changes ({(user id, post type id, post id): (was_upvote, is_upvote)}) with a fixed
+    # number of statements: the votes, the counters of all the posts merged per post, and the reputation events
+    removed = [votes[key][0] for key, (was_upvote, is_upvote) in changes.items() if is_upvote is None]
+    if removed:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {connection.ops.quote_name(Votes._meta.db_table)} "
+                           f"WHERE id IN ({', '.join(['%s'] * len(removed))})", removed)
+    Votes.objects.bulk_create([
+        Votes(user_id=user_id, post_type_id=post_type_id, post_id=post_id, upvote=is_upvote, downvote=not is_upvote)
+        for (user_id, post_type_id, post_id), (was_upvote, is_upvote) in changes.items()
+        if was_upvote is None
+    ])
+    for upvote in (True, False):
+        flipped = [votes[key][0] for key, (was_upvote, is_upvote) in changes.items()
+                   if was_upvote is not None and is_upvote is upvote]
+        if flipped:
+            Votes.objects.filter(id__in=flipped).update(upvote=upvote, downvote=not upvote)
+
+    counters = defaultdict(lambda: defaultdict(lambda: (0, 0, 0)))
+    events = []
+    reputation = {}
+    for (user_id, post_type_id, post_id), (was_upvote, is_upvote) in sorted(changes.items()):
+        upvote_delta = (is_upvote is True) - (was_upvote is True)
+        downvote_delta = (is_upvote is False) - (was_upvote is False)
+        upvotes, downvotes, score = counters[post_type_id][post_id]
+        counters[post_type_id][post_id] = (upvotes + upvote_delta, downvotes + downvote_delta,
+                                           score + upvote_delta - downvote_delta)
+        author_id, reputation_points = authors[(post_type_id, post_id)]
+        if author_id is None:
+            continue
+        # Later votes on the same author's posts see the reputation changed by the earlier ones
+        reputation.setdefault(author_id, reputation_points)
+        post_events = author_vote_events(author_id, reputation[author_id], post_type_id, post_id,
+                                         was_upvote, is_upvote)
+        reputation[author_id] += sum(event.delta for event in post_events)
+        events.extend(post_events)
+    for post_type_id, deltas in counters.items():
+        post_model = POST_TYPE_MODELS[post_type_registry.name_for(post_type_id)]
+        bulk_increment(post_model, ("upvote_count", "downvote_count", "score"), deltas)
+        if post_model is Question:
+            Question.objects.filter(id__in=deltas).update(last_activity_at=timezone.now())
+    record_events(events)
+    for question_id in question_ids_for_posts(key[1:] for key in changes):
+        transaction.on_commit(partial(question_cache.invalidate, question_id))
+
+
+def __log_vote(user_id, post_type_name, post_type_id, post_id, upvote):
+    # Write-behind mode: the click is appended to VoteLogEntry instead of being applied, so votes on a hot
+    # post never wait on its rows. The vote is resolved against the user's latest logged vote on the post,
+    # or their applied vote when none is pending, under a lock on the user's row. apply_vote_log applies
+    # and deletes entries in one transaction, so one of the two always holds the user's latest vote.
+    if not POST_TYPE_MODELS[post_type_name].objects.filter(id=post_id).exists():
+        raise Http404(f"{post_type_name} with Id {post_id} does not exist")
+    list(User.objects.select_for_update().filter(id=user_id).values_list("id"))
+    post_filter = {"user_id": user_id, "post_type_id": post_type_id, "post_id": post_id}
+    logged = list(VoteLogEntry.objects.filter(**post_filter).order_by("-id").values_list("upvote", flat=True)[:1])
+    current = logged[0] if logged else Votes.objects.filter(**post_filter).values_list("upvote", flat=True).first()
+    is_upvote = None if current == upvote else upvote
+    VoteLogEntry.objects.create(upvote=is_upvote, **post_filter)
+    return is_upvote
+
+
+def toggle_vote(user_id, post_type_name, post_id, upvote):
+    # Casts, flips or (when repeated) removes a user's vote on a post along with its counters and
+    # reputation, in the caller's transaction. Returns the resulting vote: True, False or None.
+    # With VOTE_WRITE_BEHIND the vote is logged and the counters and reputation follow once it is applied.
+    if not str(post_id).isdecimal():
+        raise Http404(f"{post_type_name} with Id {post_id} does not exist")
+    post_type_id = post_type_registry.id_for(post_type_name)
+    if settings.VOTE_WRITE_BEHIND:
+        is_upvote = __log_vote(user_id, post_type_name, post_type_id, int(post_id), upvote)
+    else:
+        was_upvote, is_upvote = __toggle(post_type_id, post_id, user_id, upvote)
+        if not apply_vote_change(post_type_id, post_id, was_upvote, is_upvote):
+            raise Http404(f"{post_type_name} with Id {post_id} does not exist")
+    transaction.on_commit(partial(count_votes, [(post_type_name, upvote)]))
+    return is_upvote
+
+
+def apply_vote_batch(user_id, items):
+    # Replays a list of vote clicks ({"post_type", "post_id", "upvote"}) by a user, in order, with a fixed
+    # number of statements however long the list is: the posts and the user's votes on them are read
+    # once, the clicks are folded into each post's final vote and only the net changes are written.
+    # With VOTE_WRITE_BEHIND the clicks are resolved against the logged votes and the changes are logged.
+    # Returns one result per item, the vote after the click or an error.
+    if not items:
+        return []
+    post_ids = defaultdict(set)
+    for item in items:
+        post_ids[item["post_type"]].add(item["post_id"])
+    authors = __load_authors(post_ids)
+    if settings.VOTE_WRITE_BEHIND:
+        initial = __load_logged_votes(post_ids, user_id)
+    else:
+        votes = __load_votes(post_ids, [user_id])
+        initial = {key: upvote for key, (_, upvote) in votes.items()}
+
+    current = dict(initial)
+    results = []
+    clicks = []
+    for item in items:
+        post = (post_type_registry.id_for(item["post_type"]), item["post_id"])
+        key = (user_id, *post)
+        if post not in authors:
+            results.append({"error": f"{item['post_type']} with Id {item['post_id']} does not exist"})
+        elif item["post_type"] != PostType.QUES and authors[post][0] == user_id:
+            # Same rule as the answer and comment vote endpoints
+            results.append({"error": "Cannot vote on own post"})
+        else:
+            current[key] = None if current.get(key) == item["upvote"] else item["upvote"]
+            results.append(vote_state(current[key]))
+            clicks.append((item["post_type"], item["upvote"]))
+    changes = {key: (initial.get(key), is_upvote) for key, is_upvote in current.items()
+               if initial.get(key) != is_upvote}
+    if changes and settings.VOTE_WRITE_BEHIND:
+        VoteLogEntry.objects.bulk_create([
+            VoteLogEntry(user_id=user_id, post_type_id=post_type_id, post_id=post_id, upvote=is_upvote)
+            for (user_id, post_type_id, post_id), (_, is_upvote) in sorted(changes.items())
+        ])
+        logger.info(msg=f"{len(changes)} votes logged by a batch of {len(items)} from user {user_id}")
+    elif changes:
+        __write_vote_changes(changes, votes, authors)
+        logger.info(msg=f"{len(changes)} votes changed by a batch of {len(items)} from user {user_id}")
+    transaction.on_commit(partial(count_votes, clicks))
+    return results
+
+
+def apply_vote_log(batch_size=None):
+    # Applies the oldest entries of the write-behind vote log: each user's latest vote per post is
+    # compared with their applied vote and only the net changes are written, merged per post, so a burst
+    # of votes on a hot post costs one counter update. Returns the number of log entries applied.
+    batch_size = batch_size or settings.VOTE_LOG_BATCH_SIZE
+    with transaction.atomic():
+        # Entries of a user on a post must be applied in order, so only one applier runs at a time
+        cursor, _ = AggregationCursor.objects.select_for_update().get_or_create(name=VOTE_LOG_CURSOR_NAME)
+        entries = list(VoteLogEntry.objects.order_by("id")
+                       .values_list("id", "user_id", "post_type_id", "post_id", "upvote")[:batch_size])
+        if not entries:
+            return 0
+        latest = {}
+        post_ids = defaultdict(set)
+        for _, user_id, post_type_id, post_id, upvote in entries:
+            latest[(user_id, post_type_id, post_id)] = upvote
+            post_ids[post_type_registry.name_for(post_type_id)].add(post_id)
+        authors = __load_authors(post_ids)
+        votes = __load_votes(post_ids, {key[0] for key in latest})
+        changes = {}
+        for key, is_upvote in latest.items():
+            was_upvote = votes[key][1] if key in votes else None
+            # Votes on posts deleted since they were logged are dropped
+            if key[1:] in authors and was_upvote != is_upvote:
+                changes[key] = (was_upvote, is_upvote)
+        if changes:
+            __write_vote_changes(changes, votes, authors)
+        VoteLogEntry.objects.filter(id__in=[entry[0] for entry in entries]).delete()
+        cursor.position = entries[-1][0]
+        cursor.save(update_fields=["position"])
+    logger.info(msg=f"Applied {len(entries)} logged votes as {len(changes)} vote changes")
+    return len(entries)
+
+
+def vote_state(is_upvote):
+    return {"upvote": is_upvote is True, "downvote": is_upvote is False}
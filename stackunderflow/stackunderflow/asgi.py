@@ -0,0 +1,13 @@
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stackunderflow.settings')
+
+# As django.core.asgi.get_asgi_application(), with a handler that streams responses off the event loop.
+# The app is imported once Django is set up, its modules read the settings.
+django.setup(set_prefix=False)
+
+from stack_underflow_app.streaming import StreamingASGIHandler  # noqa: E402 isort:skip
+
+application = StreamingASGIHandler()
@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'stack_underflow_app.metrics.MetricsMiddleware',
+    'stack_underflow_app.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,6 +46,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'stack_underflow_app.routers.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'stackunderflow.urls'
@@ -71,29 +74,152 @@ AUTH_USER_MODEL = 'stack_underflow_app.User'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+DB_POOL = bool(int(os.getenv('DB_POOL', 1)))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'stack_underflow_app.db_pool' if DB_POOL else 'django.db.backends.postgresql',
         'NAME': 'su_db',
         'USER': os.getenv('PG_USER', 'django'),
         'PASSWORD': os.getenv('PG_PASSWORD', 'postgres'),
         'HOST': os.getenv('PG_HOST', ''),
         'PORT': os.getenv('PG_PORT', 5432),
+        # Used by the pooled backend only, per process. Times are in seconds.
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 20)),
+            'MAX_LIFETIME': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+            'MAX_IDLE': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'CHECK_AFTER': float(os.getenv('DB_POOL_CHECK_AFTER', 5)),
+        },
     }
 }
 
+# Cache shared by all the worker processes, at MEMCACHED_LOCATION (host:port). The question cache, the tag registry
+# invalidations and the replica pins rely on it: without it each process has a cache of its own, which is only
+# correct with a single worker process.
+MEMCACHED_LOCATION = os.getenv('MEMCACHED_LOCATION')
+if MEMCACHED_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': MEMCACHED_LOCATION,
+        }
+    }
+
+# Read replicas of the default database, as comma separated host[:port][=weight] entries
+# (eg. PG_REPLICAS=replica1=2,replica2:5433). Reads of GET/HEAD/OPTIONS requests go to a replica picked by weight,
+# and to the primary for REPLICA_PIN_SECONDS after the user wrote something. A replica that cannot be reached is
+# left out for REPLICA_RETRY_SECONDS. Pins are kept in the default cache, which must be shared by all workers.
+REPLICA_WEIGHTS = {}
+for index, replica in enumerate(filter(None, os.getenv('PG_REPLICAS', '').split(',')), start=1):
+    address, _, weight = replica.partition('=')
+    host, _, port = address.partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_WEIGHTS[f'replica_{index}'] = float(weight or 1)
+REPLICA_PIN_SECONDS = float(os.getenv('REPLICA_PIN_SECONDS', 10))
+REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', 30))
+
+DATABASE_ROUTERS = ['stack_underflow_app.routers.ReplicaRouter']
+
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'stack_underflow_app.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_RENDERER_CLASSES': (
          'rest_framework.renderers.JSONRenderer',
     )
 }
 
+# Authentication caches of each worker: verified access tokens, and users for AUTH_USER_CACHE_TIMEOUT seconds.
+# Changes to a user made by another worker show after at most that long, reputation updated by the aggregator
+# within AUTH_USER_CACHE_SYNC_INTERVAL seconds, given CACHES points to a shared backend.
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_TIMEOUT = float(os.getenv('AUTH_USER_CACHE_TIMEOUT', 10))
+AUTH_USER_CACHE_SYNC_INTERVAL = float(os.getenv('AUTH_USER_CACHE_SYNC_INTERVAL', 2))
+
+# SQL instrumentation of a SQL_SAMPLE_RATE fraction of the requests (0 disables it, 1 profiles every request):
+# Server-Timing headers with their query count and SQL, rendering and app time, and structured logs of the requests
+# slower than SLOW_REQUEST_MS and of their queries slower than SLOW_QUERY_MS
+SQL_SAMPLE_RATE = float(os.getenv('SQL_SAMPLE_RATE', 0.01))
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500))
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+
+# Read endpoints, by URL name, serialized from values() rows by read_serializers.py instead of the DRF serializers,
+# eg. FAST_READ_ENDPOINTS=questions-list,questions-detail,ques_answers-list,ques_comments-list,ans_comments-list
+FAST_READ_ENDPOINTS = set(filter(None, os.getenv('FAST_READ_ENDPOINTS', '').split(',')))
+
+# Rows read and serialized at a time by the streamed export endpoints
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 500))
+
+# Cursor pagination of the questions list
+QUESTIONS_PAGE_SIZE = int(os.getenv('QUESTIONS_PAGE_SIZE', 20))
+QUESTIONS_MAX_PAGE_SIZE = int(os.getenv('QUESTIONS_MAX_PAGE_SIZE', 100))
+
+# In-process registry of tag name -> id lookups. Invalidations reach other workers through the
+# default cache within TAG_REGISTRY_SYNC_INTERVAL seconds, given CACHES points to a shared backend
+TAG_REGISTRY_SIZE = int(os.getenv('TAG_REGISTRY_SIZE', 10000))
+TAG_REGISTRY_SYNC_INTERVAL = float(os.getenv('TAG_REGISTRY_SYNC_INTERVAL', 5))
+
+# Write-behind counting of question views. Views are flushed to the database every
+# VIEWCOUNT_FLUSH_INTERVAL seconds (0 writes every view through) or as soon as VIEWCOUNT_MAX_PENDING
+# views are buffered, which bounds how many views a crash can lose. Repeated views of a question by
+# the same user/IP within VIEWCOUNT_DEDUP_WINDOW seconds are counted once (0 disables deduplication).
+VIEWCOUNT_FLUSH_INTERVAL = float(os.getenv('VIEWCOUNT_FLUSH_INTERVAL', 10))
+VIEWCOUNT_MAX_PENDING = int(os.getenv('VIEWCOUNT_MAX_PENDING', 1000))
+VIEWCOUNT_DEDUP_WINDOW = float(os.getenv('VIEWCOUNT_DEDUP_WINDOW', 300))
+
+# Cache of serialized question detail payloads. It defaults to the shared cache when there is one
+# (stack_underflow_app.response_cache.SharedBackend, options: alias, timeout), so that invalidations reach all
+# the workers, and to a per-process LRU otherwise.
+QUESTION_CACHE_BACKEND = os.getenv('QUESTION_CACHE_BACKEND', 'stack_underflow_app.response_cache.{}'.format(
+    'SharedBackend' if MEMCACHED_LOCATION else 'LocalMemoryBackend'))
+QUESTION_CACHE_OPTIONS = {
+    'timeout': int(os.getenv('QUESTION_CACHE_TIMEOUT', 300)),
+}
+
+# Text search configuration of the PostgreSQL full-text search on questions
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'english')
+
+# Tag autocomplete index, reloaded every TAG_SUGGEST_REFRESH_INTERVAL seconds to pick up
+# tags and question counts changed by other workers
+TAG_SUGGEST_REFRESH_INTERVAL = float(os.getenv('TAG_SUGGEST_REFRESH_INTERVAL', 60))
+TAG_SUGGEST_MAX_RESULTS = int(os.getenv('TAG_SUGGEST_MAX_RESULTS', 20))
+
+# Reputation ledger aggregation (./manage.py aggregate_reputation --loop), in batches of
+# REPUTATION_AGGREGATION_BATCH_SIZE events every REPUTATION_AGGREGATION_INTERVAL seconds once caught up
+REPUTATION_AGGREGATION_INTERVAL = float(os.getenv('REPUTATION_AGGREGATION_INTERVAL', 5))
+REPUTATION_AGGREGATION_BATCH_SIZE = int(os.getenv('REPUTATION_AGGREGATION_BATCH_SIZE', 5000))
+
+# Largest number of votes accepted by one request to the batch vote endpoint
+VOTE_BATCH_MAX_SIZE = int(os.getenv('VOTE_BATCH_MAX_SIZE', 500))
+
+# Write-behind votes: when VOTE_WRITE_BEHIND is set, votes are appended to a log and applied in batches of
+# VOTE_LOG_BATCH_SIZE by ./manage.py apply_vote_log --loop, every VOTE_LOG_APPLY_INTERVAL seconds once caught up
+VOTE_WRITE_BEHIND = bool(int(os.getenv('VOTE_WRITE_BEHIND', 0)))
+VOTE_LOG_BATCH_SIZE = int(os.getenv('VOTE_LOG_BATCH_SIZE', 5000))
+VOTE_LOG_APPLY_INTERVAL = float(os.getenv('VOTE_LOG_APPLY_INTERVAL', 1))
+
+# Feed rankings (./manage.py recompute_rankings --loop), recomputed every RANKING_INTERVAL seconds
+# for the questions with activity since the previous run, RANKING_LAG seconds of overlap included
+RANKING_INTERVAL = float(os.getenv('RANKING_INTERVAL', 60))
+RANKING_BATCH_SIZE = int(os.getenv('RANKING_BATCH_SIZE', 1000))
+RANKING_LAG = float(os.getenv('RANKING_LAG', 30))
+
+# Serve the question, answer and comment read endpoints with async views, for deployments on ASGI
+# (stackunderflow.asgi, see gunicorn.conf.py). Under WSGI each of them would need an event loop of its own.
+ASYNC_READ_ENDPOINTS = bool(int(os.getenv('ASYNC_READ_ENDPOINTS', 0)))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1)
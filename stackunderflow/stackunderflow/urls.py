@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import include, path
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
+from stack_underflow_app.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -11,4 +12,7 @@ urlpatterns = [
     path("stackunderflow/api/token/refresh", TokenRefreshView.as_view(), name="refresh_token"),
 
     path("stackunderflow/api/", include("stack_underflow_app.urls")),
+
+    # Prometheus metrics
+    path("metrics", metrics_view, name="metrics"),
 ]